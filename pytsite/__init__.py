@@ -35,8 +35,13 @@ def _init():
     reg.put('env.name', getuser() + '@' + gethostname())
     if len(argv) > 1 and argv[1] == 'test':
         reg.put('env.type', 'testing')
+    elif 'UWSGI_ORIGINAL_PROC_NAME' in environ:
+        reg.put('env.type', 'wsgi')
+    elif environ.get('PYTSITE_ENV_TYPE') == 'asgi' or any(m in sys.modules for m in ('uvicorn', 'hypercorn', 'daphne')):
+        # Application is being loaded by an ASGI server
+        reg.put('env.type', 'asgi')
     else:
-        reg.put('env.type', 'wsgi' if 'UWSGI_ORIGINAL_PROC_NAME' in environ else 'console')
+        reg.put('env.type', 'console')
 
     # Detect application's root directory path
     cur_dir = path.abspath(path.dirname(__file__))
@@ -123,8 +128,10 @@ def _init():
             if hasattr(app, 'app_load'):
                 app.app_load()
 
-            # app_load_{env.type}() hook
+            # app_load_{env.type}() hook, ASGI environment falls back to WSGI one's hook
             hook_name = 'app_load_{}'.format(reg.get('env.type'))
+            if reg.get('env.type') == 'asgi' and not hasattr(app, hook_name):
+                hook_name = 'app_load_wsgi'
             if hasattr(app, hook_name):
                 getattr(app, hook_name)()
 
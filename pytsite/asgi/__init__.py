@@ -0,0 +1,8 @@
+"""PytSite ASGI Dispatcher Entry Point
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+# Public API
+from ._app import application
@@ -0,0 +1,229 @@
+"""PytSite ASGI Application
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import sys
+import asyncio
+import contextvars
+from io import BytesIO
+from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from pytsite import reg, logger, router
+
+# Worker threads to run synchronous dispatching in
+_executor = None  # type: ThreadPoolExecutor
+
+# End of response iterable marker
+_END = object()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get worker threads pool
+    """
+    global _executor
+
+    if not _executor:
+        _executor = ThreadPoolExecutor(reg.get('asgi.max_threads', 32), 'pytsite-asgi')
+
+    return _executor
+
+
+def _build_environ(scope: dict, body: bytes, loop: asyncio.AbstractEventLoop) -> dict:
+    """Build WSGI environment from ASGI connection scope
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'pytsite.asgi.loop': loop,
+    }
+
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+
+        value = value.decode('latin1')
+        environ[name] = environ[name] + ',' + value if name in environ else value
+
+    return environ
+
+
+async def _read_body(receive: Callable) -> Optional[bytes]:
+    """Read request body, returns None if the client has disconnected
+    """
+    body = bytearray()
+
+    while True:
+        message = await receive()
+
+        if message['type'] == 'http.disconnect':
+            return None
+
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+def _respond(environ: dict, send: Callable[[dict], None]):
+    """Dispatch a request and send the response chunk by chunk
+
+    Runs in a worker thread, send() blocks until a message is sent by the event loop.
+    """
+    response_start = {}
+
+    def start_response(status: str, headers: list, exc_info=None):
+        response_start.update({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(k.encode('latin1'), v.encode('latin1')) for k, v in headers],
+        })
+
+    started = False
+    app_iter = None
+
+    try:
+        app_iter = router.dispatch(environ, start_response)
+        for chunk in app_iter:
+            if not chunk:
+                continue
+
+            if not started:
+                send(response_start)
+                started = True
+
+            send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+        if not started:
+            send(response_start)
+            started = True
+
+        send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    except Exception as e:
+        logger.error(e)
+
+        # Headers have already been sent, so the only thing to do is to drop the connection
+        if started:
+            raise
+
+        send({'type': 'http.response.start', 'status': 500, 'headers': [(b'content-type', b'text/plain')]})
+        send({'type': 'http.response.body', 'body': b'Internal Server Error', 'more_body': False})
+
+    finally:
+        if app_iter is not None and hasattr(app_iter, 'close'):
+            app_iter.close()
+
+
+async def _respond_async(environ: dict, send: Callable):
+    """Dispatch a request handled by an asynchronous controller and send the response chunk by chunk
+
+    Runs on the event loop, so the request does not hold a worker thread while its controller is awaited. Synchronous
+    parts of dispatching and response iterable are run in worker threads.
+    """
+    response_start = {}
+
+    def start_response(status: str, headers: list, exc_info=None):
+        response_start.update({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(k.encode('latin1'), v.encode('latin1')) for k, v in headers],
+        })
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    started = False
+    app_iter = None
+
+    try:
+        app_iter = await router.dispatch_async(environ, start_response, executor)
+        ctx = contextvars.copy_context()
+        chunks = await loop.run_in_executor(executor, ctx.run, iter, app_iter)
+        while True:
+            chunk = await loop.run_in_executor(executor, ctx.run, next, chunks, _END)
+            if chunk is _END:
+                break
+            if not chunk:
+                continue
+
+            if not started:
+                await send(response_start)
+                started = True
+
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+        if not started:
+            await send(response_start)
+            started = True
+
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    except Exception as e:
+        logger.error(e)
+
+        if started:
+            raise
+
+        await send({'type': 'http.response.start', 'status': 500, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Internal Server Error', 'more_body': False})
+
+    finally:
+        if app_iter is not None and hasattr(app_iter, 'close'):
+            await loop.run_in_executor(executor, ctx.run, app_iter.close)
+
+
+async def application(scope: dict, receive: Callable, send: Callable):
+    """ASGI application
+
+    Requests are dispatched by synchronous router in a bounded pool of worker threads, while requests handled by
+    asynchronous controllers are dispatched on the event loop. Uvicorn, Hypercorn and Daphne are detected during
+    PytSite initialization, other servers require 'PYTSITE_ENV_TYPE=asgi' environment variable.
+    """
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if _executor:
+                    _executor.shutdown(False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    elif scope['type'] == 'http':
+        body = await _read_body(receive)
+        if body is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        environ = _build_environ(scope, body, loop)
+
+        if router.is_async(environ):
+            await _respond_async(environ, send)
+            return
+
+        def send_sync(message: dict):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        await loop.run_in_executor(_get_executor(), _respond, environ, send_sync)
+
+    else:
+        raise ValueError("Unsupported ASGI connection type: '{}'".format(scope['type']))
@@ -5,22 +5,47 @@ __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
 # Public API
-from ._api import set_driver, has_pool, create_pool, get_pool, get_pools, cleanup
+from ._api import set_driver, get_driver, has_pool, create_pool, get_pool, get_pools, sweep, cleanup
 from . import _driver as driver, _error as error
+from ._driver import MISSING
 from ._pool import Pool
+from ._stats import get_stats, reset_stats
 
 
 def _init():
     import semaver
-    from pytsite import reg, threading, update
-
-    if reg.get('env.type') == 'wsgi':
-        def _cleanup_worker():
-            cleanup()
-            threading.run_in_thread(_cleanup_worker, 60)
-
-        # Don't use cron here due to circular dependency
-        threading.run_in_thread(_cleanup_worker, 60)
+    from pytsite import reg, threading, update, lang, console, events, logger
+    from . import _console_command, _eh, _stats
+
+    lang.register_package(__name__)
+    console.register_command(_console_command.Stats())
+    events.listen('pytsite.stats@update', _eh.stats_update)
+
+    if reg.get('env.type') in ('wsgi', 'asgi'):
+        sweep_interval = reg.get('cache.sweep_interval', 1)
+        cleanup_interval = reg.get('cache.cleanup_interval', 900)
+
+        def _sweep_worker():
+            from time import sleep
+
+            tick = 0
+            while True:
+                sleep(sweep_interval)
+                tick += 1
+                try:
+                    # Expired items are removed in small batches, full cleanup is only needed to compact stored data
+                    sweep()
+                    if not tick % max(int(cleanup_interval / sweep_interval), 1):
+                        cleanup()
+                    if _stats.is_enabled() and not tick % max(int(60 / sweep_interval), 1):
+                        _stats.dump()
+                except Exception as e:
+                    logger.error(e)
+
+        # Don't use cron here due to circular dependency. Single long-lived thread is used instead of a timer per tick.
+        thread = threading.create_thread(_sweep_worker)
+        thread.daemon = True
+        thread.start()
 
     def _update_pytsite(v_from: semaver.Version):
         if v_from <= '7.9':
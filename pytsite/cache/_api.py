@@ -5,56 +5,101 @@ __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
 from typing import Dict
-from pytsite import logger, reg
-from . import _error
+from threading import Lock
+from pytsite import logger, reg, threading
+from . import _error, _driver
 from ._driver import Abstract as _AbstractDriver
 from ._pool import Pool as _Pool
 
 _current_driver = None  # type: _AbstractDriver
 _pools = {}  # type: Dict[str, _Pool]
+_migration_lock = Lock()
+_sweep_cursor = 0
 _dbg = reg.get('cache.debug')
 
 
-def set_driver(driver: _AbstractDriver):
+def _migrate(migrating: _driver.Migrating, batch_size: int) -> int:
+    """Move keys of all pools from one driver to another and switch to the new driver when done
+    """
+    global _current_driver
+
+    total = 0
+    for pool_uid in list(_pools):
+        moved = 0
+        batch = []
+        keys = iter(migrating.old.keys(pool_uid))
+        while True:
+            # Keys are moved batch by batch to avoid loading the entire storage into memory at once
+            batch.clear()
+            for key in keys:
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    break
+
+            if not batch:
+                break
+
+            for key in batch:
+                moved += migrating.move(pool_uid, key)
+
+            logger.info("Cache migration: {} keys of pool '{}' moved".format(moved, pool_uid))
+
+        total += moved
+
+    with _migration_lock:
+        if _current_driver is migrating:
+            _current_driver = migrating.new
+
+    logger.info('Cache migration finished, {} keys moved'.format(total))
+
+    return total
+
+
+def _migrate_in_background(migrating: _driver.Migrating, batch_size: int):
+    """Move keys of all pools from one driver to another in background
+    """
+    try:
+        _migrate(migrating, batch_size)
+    except Exception as e:
+        logger.error('Cache migration failed, previous driver is kept as a fallback: {}'.format(e))
+
+
+def set_driver(driver: _AbstractDriver, migrate: str = None, batch_size: int = None):
     """Register a cache driver
+
+    When switching from one driver to another existing keys are moved to the new storage. Migration mode may be
+    'stream' to move keys batch by batch before returning, 'lazy' to move keys in background, or 'none' to drop keys of
+    the previous driver. During migration keys missing in the new storage are taken from the previous one on access.
     """
     global _current_driver
 
     if not isinstance(driver, _AbstractDriver):
         raise TypeError('Instance of {} expected, got {}'.format(_AbstractDriver, type(driver)))
 
-    # When switching from one driver to another, it is important to move existing keys to the new storage
-    keys_to_move = {}  # type: Dict[str, list]
-    if _current_driver:
-        for pool in _pools.values():
-            keys_to_move[pool.uid] = []
-            for key in pool.keys():
-                key_type = pool.type(key)
-                if key_type in (list, tuple):
-                    value = pool.get_list(key)
-                elif key_type is dict:
-                    value = pool.get_hash(key)
-                else:
-                    value = pool.get(key)
-
-                keys_to_move[pool.uid].append((key, value, pool.ttl(key)))  # Remember key and value
-                _pools[pool.uid].rm(key)  # Delete key via current driver
-
-    # Switch to the new driver
-    _current_driver = driver
-
-    # Move keys from previous driver
-    for pool_uid, keys in keys_to_move.items():
-        for key, value, ttl in keys:
-            # Clear previous value
-            _pools[pool_uid].rm(key)
-
-            if isinstance(value, list):
-                _pools[pool_uid].put_list(key, value)
-            elif isinstance(value, dict):
-                _pools[pool_uid].put_hash(key, value)
-            else:
-                _pools[pool_uid].put(key, value, ttl)
+    migrate = migrate or reg.get('cache.migrate', 'stream')
+    if migrate not in ('stream', 'lazy', 'none'):
+        raise ValueError("Unknown cache migration mode: '{}'".format(migrate))
+
+    batch_size = batch_size or reg.get('cache.migrate_batch_size', 1000)
+
+    with _migration_lock:
+        old = _current_driver
+        if isinstance(old, _driver.Migrating):
+            # Previous migration has not been finished yet, its remaining keys will stay in its old driver
+            old = old.new
+
+        if not old or migrate == 'none':
+            _current_driver = driver
+            return
+
+        _current_driver = migrating = _driver.Migrating(old, driver)
+
+    if migrate == 'lazy':
+        thread = threading.create_thread(_migrate_in_background, migrating=migrating, batch_size=batch_size)
+        thread.daemon = True
+        thread.start()
+    else:
+        _migrate(migrating, batch_size)
 
 
 def get_driver() -> _AbstractDriver:
@@ -105,6 +150,29 @@ def get_pools() -> Dict[str, _Pool]:
     return _pools.copy()
 
 
+def sweep(limit: int = None) -> int:
+    """Remove a bounded number of expired items, returns number of processed items
+
+    Pools are processed in turn, each next call starts with the pool following the last processed one, so all pools
+    are swept even if some of them always have more expired items than the limit.
+    """
+    global _sweep_cursor
+
+    limit = limit or reg.get('cache.sweep_batch_size', 100)
+    uids = sorted(_pools)
+    start = _sweep_cursor
+    n = 0
+
+    for i in range(len(uids)):
+        if n >= limit:
+            break
+
+        n += _pools[uids[(start + i) % len(uids)]].sweep(limit - n)
+        _sweep_cursor = (start + i + 1) % len(uids)
+
+    return n
+
+
 def cleanup():
     """Clear expired items in all pools
     """
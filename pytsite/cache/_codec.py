@@ -0,0 +1,152 @@
+"""PytSite Cache Values Codecs
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import pickle
+from typing import Any, Callable, Dict, Tuple
+from struct import Struct
+from pytsite import reg
+
+# Lower 4 bits of a codec byte identify a serializer, upper 4 bits identify a compressor
+PICKLE = 0
+PICKLE_OOB = 1
+MSGPACK = 2
+NO_COMPRESSION = 0
+ZSTD = 1
+LZ4 = 2
+
+_CODECS = {'pickle': PICKLE, 'msgpack': MSGPACK}
+_COMPRESSORS = {None: NO_COMPRESSION, '': NO_COMPRESSION, 'zstd': ZSTD, 'lz4': LZ4}
+_PICKLE_PROTOCOL = max(pickle.HIGHEST_PROTOCOL, pickle.DEFAULT_PROTOCOL)
+_OOB_COUNT = Struct('<I')
+_OOB_LENGTH = Struct('<Q')
+
+_compress_fns = {}  # type: Dict[int, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]
+
+
+def _compress_fn(compressor: int) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """Get compression and decompression functions
+    """
+    if compressor in _compress_fns:
+        return _compress_fns[compressor]
+
+    try:
+        if compressor == ZSTD:
+            import zstandard
+            # Compressor objects must not be shared between threads
+            fns = (lambda d: zstandard.ZstdCompressor().compress(d),
+                   lambda d: zstandard.ZstdDecompressor().decompress(d))
+        elif compressor == LZ4:
+            import lz4.frame
+            fns = (lz4.frame.compress, lz4.frame.decompress)
+        else:
+            raise ValueError('Unknown compressor: {}'.format(compressor))
+    except ImportError as e:
+        raise RuntimeError('Cache values compressor is not available: {}'.format(e))
+
+    _compress_fns[compressor] = fns
+
+    return fns
+
+
+def _pickle_dump(value: Any) -> Tuple[int, bytes]:
+    """Serialize a value using pickle, passing large buffers out-of-band if possible
+    """
+    if _PICKLE_PROTOCOL < 5:
+        return PICKLE, pickle.dumps(value, _PICKLE_PROTOCOL)
+
+    buffers = []
+    data = pickle.dumps(value, _PICKLE_PROTOCOL, buffer_callback=buffers.append)
+    if not buffers:
+        return PICKLE, data
+
+    raws = [b.raw() for b in buffers]
+    head = _OOB_COUNT.pack(len(raws)) + b''.join(_OOB_LENGTH.pack(r.nbytes) for r in raws)
+
+    return PICKLE_OOB, b''.join([head, _OOB_LENGTH.pack(len(data)), data] + [r.tobytes() for r in raws])
+
+
+def _pickle_load_oob(data: bytes) -> Any:
+    """Deserialize a value serialized using pickle with out-of-band buffers
+    """
+    view = memoryview(data)
+    count = _OOB_COUNT.unpack_from(view)[0]
+    pos = _OOB_COUNT.size
+    lengths = []
+    for i in range(count + 1):
+        lengths.append(_OOB_LENGTH.unpack_from(view, pos)[0])
+        pos += _OOB_LENGTH.size
+
+    main = view[pos:pos + lengths[-1]]
+    pos += lengths[-1]
+    buffers = []
+    for length in lengths[:-1]:
+        buffers.append(view[pos:pos + length])
+        pos += length
+
+    return pickle.loads(main, buffers=buffers)
+
+
+def _msgpack_dump(value: Any) -> Tuple[int, bytes]:
+    """Serialize a value using msgpack, falling back to pickle for unsupported types
+    """
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError("Package 'msgpack' is required by the msgpack cache codec")
+
+    # Strict types make msgpack reject tuples and subclasses of built-in types instead of silently turning them into
+    # lists and plain dicts, so such values are pickled and restored with their original types
+    try:
+        return MSGPACK, msgpack.packb(value, use_bin_type=True, strict_types=True)
+    except (TypeError, ValueError, OverflowError):
+        return _pickle_dump(value)
+
+
+def get_options(pool: str) -> Tuple[int, int, int]:
+    """Get serializer, compressor and compression threshold of a pool
+    """
+    codec = reg.get('cache.pool_codec', {}).get(pool, reg.get('cache.codec', 'pickle'))
+    compressor = reg.get('cache.pool_compress', {}).get(pool, reg.get('cache.compress'))
+
+    try:
+        return _CODECS[codec], _COMPRESSORS[compressor], reg.get('cache.compress_min_bytes', 1024)
+    except KeyError as e:
+        raise ValueError('Unknown cache codec or compressor: {}'.format(e))
+
+
+def encode(value: Any, pool: str) -> Tuple[int, bytes]:
+    """Serialize a value according to pool's options
+
+    Returns codec byte which must be stored along with data in order to decode it.
+    """
+    codec, compressor, min_bytes = get_options(pool)
+    codec, data = _msgpack_dump(value) if codec == MSGPACK else _pickle_dump(value)
+
+    if compressor and len(data) >= min_bytes:
+        compressed = _compress_fn(compressor)[0](data)
+        if len(compressed) < len(data):
+            return codec | compressor << 4, compressed
+
+    return codec, data
+
+
+def decode(codec: int, data: bytes) -> Any:
+    """Deserialize a value
+    """
+    compressor = codec >> 4
+    if compressor:
+        data = _compress_fn(compressor)[1](data)
+
+    codec &= 0x0f
+    if codec == PICKLE:
+        return pickle.loads(data)
+    elif codec == PICKLE_OOB:
+        return _pickle_load_oob(data)
+    elif codec == MSGPACK:
+        import msgpack
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    raise ValueError('Unknown cache codec: {}'.format(codec))
@@ -0,0 +1,47 @@
+"""PytSite Cache Console Commands
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+from pytsite import console, lang
+from . import _stats
+
+
+class Stats(console.Command):
+    """'cache:stats' Console Command
+    """
+
+    @property
+    def name(self) -> str:
+        """Get name of the command.
+        """
+        return 'cache:stats'
+
+    @property
+    def description(self) -> str:
+        """Get description of the command.
+        """
+        return 'pytsite.cache@stats_console_command_description'
+
+    @property
+    def signature(self) -> str:
+        """Get signature of the command.
+        """
+        return '{} [POOL]'.format(super().signature)
+
+    def exec(self):
+        """Execute the command.
+        """
+        # Console runs in its own process, so statistics dumped by application's processes are collected
+        all_stats = _stats.get_stats(self.arg(0), True)
+        if not all_stats:
+            console.print_info(lang.t('pytsite.cache@no_stats_collected'))
+            return
+
+        for p_uid, p_stats in sorted(all_stats.items()):
+            console.print_info(_stats.format_stats(p_uid, True))
+            for op, l_stats in sorted(p_stats['latency'].items()):
+                buckets = ', '.join('{}{} ms: {}'.format('<=' if b else '>', b or _stats.LATENCY_BUCKETS[-1], n)
+                                    for b, n in l_stats['buckets'].items() if n)
+                console.print_normal('  {}: {} calls, {}'.format(op, l_stats['count'], buckets))
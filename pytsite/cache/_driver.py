@@ -4,14 +4,40 @@ __author__ = 'Oleksandr Shepetko'
 __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
-from typing import Any, Mapping, List, Generator, Optional, Type
+from typing import Any, Mapping, List, Generator, Optional, Type, Dict, Tuple, Iterable
 from abc import ABC, abstractmethod
-from os import path, unlink, makedirs, walk
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock, RLock
+from os import path, unlink, makedirs, walk, replace, fdopen, fchmod, open as os_open, close as os_close, pread, \
+    pwrite, ftruncate, O_RDWR, O_RDONLY, O_CREAT
+from os import read as os_read
+from struct import Struct, error as StructError
+from fcntl import flock, LOCK_EX
+from tempfile import mkstemp
+from concurrent.futures import ThreadPoolExecutor
+from heapq import heappush, heappop, heapify
 from shutil import rmtree
-from pickle import dumps as pickle_dump, loads as pickle_load, UnpicklingError
+from pickle import dumps as pickle_dump, loads as pickle_load, UnpicklingError, PicklingError
 from time import time
 from pytsite import reg, util
-from . import _error
+from . import _error, _codec, _stats
+from ._file_index import FileIndex as _FileIndex
+
+
+class _Missing:
+    """Missing Value Marker
+    """
+
+    def __repr__(self) -> str:
+        return 'MISSING'
+
+    def __bool__(self) -> bool:
+        return False
+
+
+# Returned by bulk operations in place of values of not existing keys
+MISSING = _Missing()
 
 
 class Abstract(ABC):
@@ -24,6 +50,13 @@ class Abstract(ABC):
         """
         pass
 
+    def scan(self, pool: str, prefix: str) -> Generator[str, None, None]:
+        """Get keys of the pool which start with a prefix
+        """
+        for key in self.keys(pool):
+            if key.startswith(prefix):
+                yield key
+
     @abstractmethod
     def has(self, pool: str, key: str) -> bool:
         """Check whether the pool contains the key
@@ -48,6 +81,35 @@ class Abstract(ABC):
         """
         pass
 
+    def get_many(self, pool: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several items from the pool, MISSING is returned for not existing keys
+        """
+        r = {}
+        for key in keys:
+            try:
+                r[key] = self.get(pool, key)
+            except _error.KeyNotExist:
+                r[key] = MISSING
+
+        return r
+
+    def put_many(self, pool: str, items: Mapping[str, Any], ttl: int = None):
+        """Put several items into the pool
+        """
+        for key, value in items.items():
+            self.put(pool, key, value, ttl)
+
+    def has_many(self, pool: str, keys: Iterable[str]) -> Dict[str, bool]:
+        """Check whether the pool contains several keys
+        """
+        return {key: self.has(pool, key) for key in keys}
+
+    def rm_many(self, pool: str, keys: Iterable[str]):
+        """Remove several values from the pool
+        """
+        for key in keys:
+            self.rm(pool, key)
+
     @abstractmethod
     def put_hash(self, pool: str, key: str, value: Mapping, ttl: int = None) -> Any:
         """Put a hash item into the pool
@@ -144,6 +206,38 @@ class Abstract(ABC):
         """
         pass
 
+    def rm_prefix(self, pool: str, prefix: str):
+        """Remove all values which keys start with a prefix
+        """
+        for key in list(self.scan(pool, prefix)):
+            self.rm(pool, key)
+
+    def lock(self, pool: str, key: str, ttl: int) -> bool:
+        """Try to acquire an expiring lock named after the key without waiting
+
+        Drivers should override this method with an atomic implementation, the default one is not atomic.
+        """
+        lock_key = '__lock__:' + key
+        if self.has(pool, lock_key):
+            return False
+
+        self.put(pool, lock_key, time(), ttl)
+
+        return True
+
+    def unlock(self, pool: str, key: str):
+        """Release a lock acquired by lock()
+        """
+        self.rm(pool, '__lock__:' + key)
+
+    def sweep(self, pool: str, limit: int) -> int:
+        """Remove at most limit expired items from the pool, returns number of processed items
+
+        Drivers which can find expired items without walking the entire pool should override this method, otherwise
+        expired items are removed by cleanup() only.
+        """
+        return 0
+
     @abstractmethod
     def cleanup(self, pool: str):
         """Cleanup outdated items from the pool
@@ -157,9 +251,44 @@ class Abstract(ABC):
         pass
 
 
+# Magic, format version, kind, codec, created, expires, TTL, key length, type length, payload length
+_ITEM_HEAD = Struct('<4sBBBdddHHQ')
+_ITEM_MAGIC = b'PTCI'
+_ITEM_VERSION = 1
+_ITEM_KIND_VALUE, _ITEM_KIND_HASH, _ITEM_KIND_LIST = range(3)
+
+_LIST_REC_HEAD = Struct('<IB')  # Payload length, codec
+_LIST_REC_TAIL = Struct('<I')  # Payload length
+_LIST_REC_OVERHEAD = _LIST_REC_HEAD.size + _LIST_REC_TAIL.size
+
+# Fields of list segment descriptor
+_SEG_ID, _SEG_REV, _SEG_LO, _SEG_HI, _SEG_LEN = range(5)
+
+
 class File(Abstract):
     """PytSite Filesystem Based Cache
+
+    Files are written to a temporary location and atomically moved into place, so readers never see partially written
+    items. Read-modify-write operations are serialized between processes by advisory locks per key's directory.
+
+    Lists are stored as a chain of append-only segment files described by a small index in the key's file. Every
+    element is written as a record carrying its length at both ends, so pushes and pops at either end of the list are
+    O(1) appends or offset moves, regardless of list length.
+
+    Keys, their types and expiration times are also tracked in a per pool index, which serves keys listing, metadata
+    queries and cleanup without reading items' files.
+
+    Each item's file starts with a small header holding item's metadata, followed by the serialized value, so metadata
+    can be read without deserializing the value. Files written by previous versions as a single pickled dict are still
+    read transparently and get replaced by the new format on next write.
+
+    Values and list elements are serialized by a codec configured per pool and may be compressed, see `_codec`. The
+    codec is recorded with every value, so changing pool's codec does not invalidate existing items.
+
+    Bulk operations process files in parallel using a thread pool shared by all instances of the driver.
     """
+    _executor = None  # type: ThreadPoolExecutor
+    _executor_lock = Lock()
 
     def __init__(self):
         """Init
@@ -168,10 +297,17 @@ class File(Abstract):
 
         self._server_name = router.server_name()
         self.path = reg.get('cache.file_driver_storage', path.join(reg.get('paths.storage'), 'cache'))
-
-        # Create cache directory
-        if not path.exists(self.path):
-            makedirs(self.path, 0o755, True)
+        self._tmp_path = path.join(self.path, '.tmp')
+        self._locks_path = path.join(self.path, '.locks', self._server_name)
+        self._lists_path = path.join(self.path, '.lists', self._server_name)
+        self._list_segment_size = reg.get('cache.file_driver_list_segment_size', 262144)
+        self._index = _FileIndex(path.join(self.path, '.index', self._server_name), self._index_rebuild)
+        self._io_threads = reg.get('cache.file_driver_io_threads', 8)
+
+        # Create cache directories
+        for d_path in (self.path, self._tmp_path, self._locks_path):
+            if not path.exists(d_path):
+                makedirs(d_path, 0o755, True)
 
     def _get_key_path(self, pool: str, key: str) -> str:
         """Get key's file path
@@ -184,62 +320,390 @@ class File(Abstract):
         """
         return path.dirname(self._get_key_path(pool, key))
 
-    def _store(self, pool: str, key: str, value: Any, ttl: int = None) -> Any:
+    def _get_list_dir(self, pool: str, key: str) -> str:
+        """Get directory of list's segments
+        """
+        h = util.md5_hex_digest(key)
+        return path.join(self._lists_path, pool, h[:2], h[2:4], key.replace(path.sep, '.'))
+
+    @contextmanager
+    def _lock(self, pool: str, key: str):
+        """Acquire an exclusive lock on the key
+        """
+        h = util.md5_hex_digest(key)
+        d_path = path.join(self._locks_path, pool, h[:2])
+        l_path = path.join(d_path, h[2:4])
+
+        try:
+            fd = os_open(l_path, O_RDWR | O_CREAT, 0o644)
+        except FileNotFoundError:
+            makedirs(d_path, 0o755, True)
+            fd = os_open(l_path, O_RDWR | O_CREAT, 0o644)
+
+        try:
+            flock(fd, LOCK_EX)
+            yield
+        finally:
+            os_close(fd)
+
+    def _write(self, f_path: str, data: bytes):
+        """Atomically write a file
+        """
+        fd, tmp_path = mkstemp(dir=self._tmp_path)
+
+        try:
+            with fdopen(fd, 'wb') as f:
+                fchmod(f.fileno(), 0o644)
+                f.write(data)
+
+            try:
+                replace(tmp_path, f_path)
+            except FileNotFoundError:
+                makedirs(path.dirname(f_path), 0o755, True)
+                replace(tmp_path, f_path)
+
+        except BaseException as e:
+            try:
+                unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise e
+
+    def _index_rebuild(self, pool: str) -> Generator[Tuple[str, str, float, Optional[float], Type], None, None]:
+        """Read index records from items' files
+        """
+        for root, dirs, files in walk(path.join(self.path, self._server_name, pool)):
+            for name in files:
+                f_path = path.join(root, name)
+                try:
+                    raw = self._read(f_path, True)
+                except (FileNotFoundError, EOFError, UnpicklingError, StructError):
+                    continue
+
+                yield raw['k'], f_path, raw['c'], raw['e'], raw['y']
+
+    @staticmethod
+    def _read(f_path: str, header_only: bool = False) -> dict:
+        """Read an item's file
+        """
+        with open(f_path, 'rb') as f:
+            head = f.read(_ITEM_HEAD.size)
+
+            # File written by previous versions, which contains a single pickled dict
+            if not head.startswith(_ITEM_MAGIC):
+                data = head + f.read()
+                raw = pickle_load(data)
+                raw['y'] = list if raw.get('s') else type(raw['v'])
+                raw['b'] = len(data)
+                return raw
+
+            magic, version, kind, codec, created, expires, ttl, k_len, t_len, v_len = _ITEM_HEAD.unpack(head)
+            meta = f.read(k_len + t_len)
+            raw = {
+                'k': meta[:k_len].decode(),
+                'c': created,
+                'e': expires or None,
+                't': ttl or None,
+                'y': pickle_load(meta[k_len:]),
+            }
+            if kind == _ITEM_KIND_LIST:
+                raw['s'] = True
+
+            raw['b'] = _ITEM_HEAD.size + k_len + t_len
+            if not header_only:
+                data = f.read(v_len)
+                if len(data) != v_len:
+                    raise EOFError('Unexpected end of file')
+                raw['v'] = _codec.decode(codec, data)
+                raw['b'] += v_len
+
+            return raw
+
+    def _store(self, pool: str, key: str, value: Any, ttl: int = None, segmented: bool = False) -> Any:
         """Store an item into the pool
         """
+        now = time()
+        expires = (now + ttl) if ttl else None
+        value_type = list if segmented else type(value)
         f_path = self._get_key_path(pool, key)
-        d_path = path.dirname(f_path)
 
-        if not path.exists(d_path):
-            makedirs(d_path, 0o755)
+        if segmented:
+            kind = _ITEM_KIND_LIST
+        elif isinstance(value, dict):
+            kind = _ITEM_KIND_HASH
+        else:
+            kind = _ITEM_KIND_VALUE
 
-        with open(f_path, 'wb') as f:
-            now = time()
-            f.write(pickle_dump({'k': key, 'c': now, 't': ttl, 'e': (now + ttl) if ttl else None, 'v': value}))
+        k_data = key.encode()
+        t_data = pickle_dump(value_type)
+        codec, v_data = _codec.encode(value, pool)
+        head = _ITEM_HEAD.pack(_ITEM_MAGIC, _ITEM_VERSION, kind, codec, now, expires or 0, ttl or 0, len(k_data),
+                               len(t_data), len(v_data))
+
+        self._write(f_path, b''.join((head, k_data, t_data, v_data)))
+        _stats.count(pool, 'bytes_written', len(head) + len(k_data) + len(t_data) + len(v_data))
+        self._index.put(pool, key, f_path, now, expires, value_type)
 
         return value
 
-    def _load(self, pool: str, key: str) -> dict:
+    def _rm(self, pool: str, key: str):
+        """Remove an item from the pool
+        """
+        try:
+            unlink(self._get_key_path(pool, key))
+        except FileNotFoundError:
+            pass
+
+        rmtree(self._get_list_dir(pool, key), True)
+        self._index.rm(pool, key)
+
+    def _load(self, pool: str, key: str, header_only: bool = False, expired: bool = False) -> dict:
         """Load an item from the pool
         """
         f_path = self._get_key_path(pool, key)
 
         try:
-            with open(f_path, 'rb') as f:
-                return pickle_load(f.read())
+            raw = self._read(f_path, header_only)
+            _stats.count(pool, 'bytes_read', raw['b'])
+
+            # Expired items are treated as not existing until the sweeper removes them
+            if not expired and raw['e'] and raw['e'] <= time():
+                raise _error.KeyNotExist(pool, key)
+
+            return raw
 
         except FileNotFoundError:
             raise _error.KeyNotExist(pool, key)
 
-        except (EOFError, UnpicklingError):
+        except (EOFError, UnpicklingError, StructError):
             unlink(f_path)
             raise _error.KeyNotExist(pool, key)
 
     def _load_check_type(self, pool: str, key: str, expected_type: type) -> dict:
         raw = self._load(pool, key)
-        if not isinstance(raw['v'], expected_type):
+        if raw.get('s'):
+            if expected_type is not list:
+                raise _error.ValueTypeError(pool, key, [])
+        elif not isinstance(raw['v'], expected_type):
             raise _error.ValueTypeError(pool, key, raw['v'])
 
         return raw
 
+    @staticmethod
+    def _list_encode(pool: str, value: Any) -> bytes:
+        """Encode a list element into a segment record
+        """
+        codec, data = _codec.encode(value, pool)
+
+        return _LIST_REC_HEAD.pack(len(data), codec) + data + _LIST_REC_TAIL.pack(len(data))
+
+    @staticmethod
+    def _list_decode(data: bytes) -> list:
+        """Decode all records from a segment's byte range
+        """
+        r = []
+        pos = 0
+        while pos < len(data):
+            length, codec = _LIST_REC_HEAD.unpack_from(data, pos)
+            pos += _LIST_REC_HEAD.size
+            r.append(_codec.decode(codec, data[pos:pos + length]))
+            pos += length + _LIST_REC_TAIL.size
+
+        return r
+
+    def _list_write_segment(self, pool: str, l_dir: str, seg: list, records: bytes):
+        """Append records to a segment, discarding its dead tail
+        """
+        s_path = path.join(l_dir, str(seg[_SEG_ID]))
+
+        try:
+            fd = os_open(s_path, O_RDWR | O_CREAT, 0o644)
+        except FileNotFoundError:
+            makedirs(l_dir, 0o755, True)
+            fd = os_open(s_path, O_RDWR | O_CREAT, 0o644)
+
+        try:
+            pwrite(fd, records, seg[_SEG_HI])
+            ftruncate(fd, seg[_SEG_HI] + len(records))
+        finally:
+            os_close(fd)
+
+        seg[_SEG_HI] += len(records)
+        _stats.count(pool, 'bytes_written', len(records))
+
+    def _list_read_segment(self, pool: str, l_dir: str, seg: list) -> list:
+        """Read all elements of a segment in logical order
+        """
+        fd = os_open(path.join(l_dir, str(seg[_SEG_ID])), O_RDONLY)
+        try:
+            r = self._list_decode(pread(fd, seg[_SEG_HI] - seg[_SEG_LO], seg[_SEG_LO]))
+        finally:
+            os_close(fd)
+
+        _stats.count(pool, 'bytes_read', seg[_SEG_HI] - seg[_SEG_LO])
+
+        if seg[_SEG_REV]:
+            r.reverse()
+
+        return r
+
+    def _list_build_index(self, pool: str, l_dir: str, value: list) -> dict:
+        """Write list's elements into new segments and return list's index
+        """
+        rmtree(l_dir, True)
+
+        index = {'n': 0, 'len': 0, 'segs': []}
+        records = []
+        size = 0
+        for i, v in enumerate(value, 1):
+            records.append(self._list_encode(pool, v))
+            size += len(records[-1])
+
+            if size >= self._list_segment_size or i == len(value):
+                seg = [index['n'], False, 0, 0, len(records)]
+                self._list_write_segment(pool, l_dir, seg, b''.join(records))
+                index['segs'].append(seg)
+                index['n'] += 1
+                index['len'] += len(records)
+                records = []
+                size = 0
+
+        return index
+
+    def _list_index(self, pool: str, key: str, raw: dict) -> dict:
+        """Get list's index, converting a list stored as a single value if necessary
+        """
+        if raw.get('s'):
+            return raw['v']
+
+        return self._list_build_index(pool, self._get_list_dir(pool, key), raw['v'])
+
+    def _list_is_fragmented(self, index: dict) -> bool:
+        """Check whether list's segments contain too many consumed records or the list became too fragmented
+        """
+        size = sum(seg[_SEG_HI] - seg[_SEG_LO] for seg in index['segs'])
+        dead = sum(seg[_SEG_LO] for seg in index['segs'])
+
+        return dead > size or len(index['segs']) > 2 + 2 * (size // self._list_segment_size)
+
+    def _list_compact(self, pool: str, key: str, index: dict, ttl: Optional[float]) -> dict:
+        """Rewrite list's segments if the list is fragmented, stores list's index
+        """
+        if self._list_is_fragmented(index):
+            l_dir = self._get_list_dir(pool, key)
+            value = []
+            for seg in index['segs']:
+                value.extend(self._list_read_segment(pool, l_dir, seg))
+            index = self._list_build_index(pool, l_dir, value)
+
+        self._store(pool, key, index, ttl, True)
+
+        return index
+
+    def _list_push(self, pool: str, key: str, value: Any, ttl: int, left: bool) -> int:
+        """Insert the value into the list stored at key
+        """
+        with self._lock(pool, key):
+            try:
+                raw = self._load_check_type(pool, key, list)
+                index = self._list_index(pool, key, raw)
+                ttl = raw['t']
+            except _error.KeyNotExist:
+                index = self._list_build_index(pool, self._get_list_dir(pool, key), [])
+
+            segs = index['segs']
+            seg = (segs[0] if left else segs[-1]) if segs else None
+            if not seg or seg[_SEG_REV] != left or seg[_SEG_HI] >= self._list_segment_size:
+                seg = [index['n'], left, 0, 0, 0]
+                index['n'] += 1
+                segs.insert(0, seg) if left else segs.append(seg)
+
+            self._list_write_segment(pool, self._get_list_dir(pool, key), seg, self._list_encode(pool, value))
+            seg[_SEG_LEN] += 1
+            index['len'] += 1
+
+            self._store(pool, key, index, ttl, True)
+
+            return index['len']
+
+    def _list_pop(self, pool: str, key: str, left: bool) -> Any:
+        """Remove and return an element from either end of the list stored at key
+        """
+        with self._lock(pool, key):
+            raw = self._load_check_type(pool, key, list)
+            index = self._list_index(pool, key, raw)
+            l_dir = self._get_list_dir(pool, key)
+            seg = index['segs'][0] if left else index['segs'][-1]
+            s_path = path.join(l_dir, str(seg[_SEG_ID]))
+
+            fd = os_open(s_path, O_RDWR)
+            try:
+                # Logical start of a segment is physical start of the file, unless the segment is reversed
+                if left != seg[_SEG_REV]:
+                    length, codec = _LIST_REC_HEAD.unpack(pread(fd, _LIST_REC_HEAD.size, seg[_SEG_LO]))
+                    r = _codec.decode(codec, pread(fd, length, seg[_SEG_LO] + _LIST_REC_HEAD.size))
+                    seg[_SEG_LO] += length + _LIST_REC_OVERHEAD
+                else:
+                    tail_start = seg[_SEG_HI] - _LIST_REC_TAIL.size
+                    length = _LIST_REC_TAIL.unpack(pread(fd, _LIST_REC_TAIL.size, tail_start))[0]
+                    rec_start = tail_start - length - _LIST_REC_HEAD.size
+                    codec = _LIST_REC_HEAD.unpack(pread(fd, _LIST_REC_HEAD.size, rec_start))[1]
+                    r = _codec.decode(codec, pread(fd, length, rec_start + _LIST_REC_HEAD.size))
+                    seg[_SEG_HI] = rec_start
+                    ftruncate(fd, seg[_SEG_HI])
+            finally:
+                os_close(fd)
+
+            _stats.count(pool, 'bytes_read', length + _LIST_REC_OVERHEAD)
+            seg[_SEG_LEN] -= 1
+            index['len'] -= 1
+
+            if not seg[_SEG_LEN]:
+                index['segs'].remove(seg)
+                unlink(s_path)
+
+            # Lists used as queues are compacted right away, so consumed records do not pile up until next cleanup
+            if index['len']:
+                self._list_compact(pool, key, index, raw['t'])
+            else:
+                self._rm(pool, key)
+
+            return r
+
     def keys(self, pool: str) -> Generator[str, None, None]:
         """Get all keys of the pool
         """
-        for root, dirs, files in walk(path.join(self.path, self._server_name, pool), topdown=False):
-            for name in files:
-                f_path = path.join(root, name)
-                with open(f_path, 'rb') as f:
-                    yield pickle_load(f.read())['k']
+        yield from self._index.keys(pool, now=time())
+
+    def scan(self, pool: str, prefix: str) -> Generator[str, None, None]:
+        """Get keys of the pool which start with a prefix
+        """
+        yield from self._index.keys(pool, prefix, time())
+
+    def _index_get(self, pool: str, key: str) -> Optional[Tuple[str, float, Optional[float], Type]]:
+        """Get key's row from the index
+        """
+        row = self._index.get(pool, key)
+        if row and row[2] and row[2] <= time():
+            raise _error.KeyNotExist(pool, key)
+
+        return row
 
     def has(self, pool: str, key: str) -> bool:
         """Check whether the pool contains the key
         """
-        return path.exists(self._get_key_path(pool, key))
+        try:
+            self._load(pool, key, True)
+            return True
+        except _error.KeyNotExist:
+            return False
 
     def type(self, pool: str, key: str) -> Type:
         """Get key's value type
         """
-        return type(self._load(pool, key)['v'])
+        row = self._index_get(pool, key)
+
+        return row[3] if row else self._load(pool, key, True)['y']
 
     def put(self, pool: str, key: str, value: Any, ttl: int = None) -> Any:
         """Put an item into the pool
@@ -247,36 +711,76 @@ class File(Abstract):
         if isinstance(value, (dict, list)):
             raise _error.ValueTypeError(pool, key, value)
 
-        return self._store(pool, key, value, ttl)
+        with self._lock(pool, key):
+            return self._store(pool, key, value, ttl)
 
     def get(self, pool: str, key: str) -> Any:
         """Get an item from the pool
         """
-        value = self._load(pool, key)['v']
+        raw = self._load(pool, key)
+        if raw.get('s'):
+            raise _error.ValueTypeError(pool, key, [])
+
+        value = raw['v']
         if isinstance(value, (dict, list)):
             raise _error.ValueTypeError(pool, key, value)
 
         return value
 
+    def _map(self, fn, *iterables) -> list:
+        """Apply a function to every item of iterables in parallel
+        """
+        if File._executor is None:
+            with File._executor_lock:
+                if File._executor is None:
+                    File._executor = ThreadPoolExecutor(self._io_threads, 'pytsite.cache')
+
+        return list(File._executor.map(fn, *iterables))
+
+    def get_many(self, pool: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several items from the pool, MISSING is returned for not existing keys
+        """
+        def get(key: str) -> Any:
+            try:
+                return self.get(pool, key)
+            except _error.KeyNotExist:
+                return MISSING
+
+        keys = list(keys)
+
+        return dict(zip(keys, self._map(get, keys) if len(keys) > 1 else map(get, keys)))
+
+    def put_many(self, pool: str, items: Mapping[str, Any], ttl: int = None):
+        """Put several items into the pool
+        """
+        self._map(lambda key: self.put(pool, key, items[key], ttl), items.keys())
+
+    def rm_many(self, pool: str, keys: Iterable[str]):
+        """Remove several values from the pool
+        """
+        self._map(lambda key: self.rm(pool, key), keys)
+
     def put_hash(self, pool: str, key: str, value: Mapping, ttl: int = None) -> Any:
         """Put a hash item into the pool
         """
         if not isinstance(value, Mapping):
             raise _error.ValueTypeError(pool, key, value)
 
-        return self._store(pool, key, dict(value), ttl)
+        with self._lock(pool, key):
+            return self._store(pool, key, dict(value), ttl)
 
     def put_hash_item(self, pool: str, key: str, item_key: str, value: Any, ttl: int = None) -> Any:
         """Put a value into a hash
         """
-        try:
-            raw = self._load_check_type(pool, key, dict)
-            val = raw['v']
-            val[item_key] = value
-            return self._store(pool, key, val, raw['t'])
+        with self._lock(pool, key):
+            try:
+                raw = self._load_check_type(pool, key, dict)
+                val = raw['v']
+                val[item_key] = value
+                return self._store(pool, key, val, raw['t'])
 
-        except _error.KeyNotExist:
-            return self._store(pool, key, {item_key: value}, ttl)
+            except _error.KeyNotExist:
+                return self._store(pool, key, {item_key: value}, ttl)
 
     def get_hash(self, pool: str, key: str, hash_keys: List[str] = None) -> dict:
         """Get hash
@@ -293,25 +797,45 @@ class File(Abstract):
     def rm_hash_item(self, pool: str, key: str, item_key: str) -> Any:
         """Remove a value from a hash
         """
-        raw = self._load_check_type(pool, key, dict)
-        val = raw['v']
+        with self._lock(pool, key):
+            raw = self._load_check_type(pool, key, dict)
+            val = raw['v']
 
-        try:
-            val.pop(item_key)
-        except KeyError:
-            pass
+            try:
+                val.pop(item_key)
+            except KeyError:
+                pass
 
-        return self._store(pool, key, val, raw['t'])
+            return self._store(pool, key, val, raw['t'])
 
     def list_len(self, pool: str, key: str) -> int:
         """Return the length of the list stored at key
         """
-        return len(self._load_check_type(pool, key, list)['v'])
+        raw = self._load_check_type(pool, key, list)
+
+        return raw['v']['len'] if raw.get('s') else len(raw['v'])
 
     def get_list(self, pool: str, key: str, start: int = 0, end: int = None) -> list:
         """Return the specified elements of the list stored at key
         """
-        return self._load_check_type(pool, key, list)['v'][start:end]
+        with self._lock(pool, key):
+            raw = self._load_check_type(pool, key, list)
+            if not raw.get('s'):
+                return raw['v'][start:end]
+
+            # Read only segments which overlap requested range
+            l_dir = self._get_list_dir(pool, key)
+            rng = range(raw['v']['len'])[start:end]
+            r = []
+            seg_start = 0
+            for seg in raw['v']['segs']:
+                seg_end = seg_start + seg[_SEG_LEN]
+                if rng and seg_start < rng.stop and seg_end > rng.start:
+                    items = self._list_read_segment(pool, l_dir, seg)
+                    r.extend(items[max(rng.start - seg_start, 0):rng.stop - seg_start])
+                seg_start = seg_end
+
+            return r
 
     def put_list(self, pool, key: str, value: list, ttl: int = None) -> list:
         """Store a list
@@ -319,59 +843,43 @@ class File(Abstract):
         if not isinstance(value, list):
             raise _error.ValueTypeError(pool, key, value)
 
-        return self._store(pool, key, value, ttl)
+        with self._lock(pool, key):
+            self._store(pool, key, self._list_build_index(pool, self._get_list_dir(pool, key), value), ttl, True)
+
+        return value
 
     def list_l_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
         """Insert the value at the head of the list stored at key
         """
-        try:
-            raw = self._load_check_type(pool, key, list)
-            val = raw['v']
-            val.insert(0, value)
-            return len(self._store(pool, key, val, raw['t']))
-        except _error.KeyNotExist:
-            return len(self._store(pool, key, [value], ttl))
+        return self._list_push(pool, key, value, ttl, True)
 
     def list_r_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
         """Insert the value at the tail of the list stored at key
         """
-        try:
-            raw = self._load_check_type(pool, key, list)
-            val = raw['v']
-            val.append(value)
-            return len(self._store(pool, key, val, raw['t']))
-        except _error.KeyNotExist:
-            return len(self._store(pool, key, [value], ttl))
+        return self._list_push(pool, key, value, ttl, False)
 
     def list_l_pop(self, pool: str, key: str) -> Any:
         """Remove and return the first element of the list stored at key
         """
-        raw = self._load_check_type(pool, key, list)
-        val = raw['v']
-        r = val.pop(0)
-        self._store(pool, key, val, raw['t']) if val else self.rm(pool, key)
-
-        return r
+        return self._list_pop(pool, key, True)
 
     def list_r_pop(self, pool: str, key: str) -> Any:
         """Remove and return the last element of the list stored at key
         """
-        raw = self._load_check_type(pool, key, list)
-        val = raw['v']
-        r = val.pop()
-        self._store(pool, key, val, raw['t']) if val else self.rm(pool, key)
-
-        return r
+        return self._list_pop(pool, key, False)
 
     def expire(self, pool: str, key: str, ttl: int):
         """Set a timeout on key
         """
-        self._store(pool, key, self._load(pool, key)['v'], ttl)
+        with self._lock(pool, key):
+            raw = self._load(pool, key)
+            self._store(pool, key, raw['v'], ttl, raw.get('s', False))
 
     def ttl(self, pool: str, key: str) -> Optional[int]:
         """Get remaining time to live of a key
         """
-        expires = self._load(pool, key)['e']
+        row = self._index_get(pool, key)
+        expires = row[2] if row else self._load(pool, key, True)['e']
 
         return int(expires - time()) if expires else None
 
@@ -383,30 +891,1601 @@ class File(Abstract):
     def rm(self, pool: str, key: str):
         """Remove a value from the pool
         """
+        with self._lock(pool, key):
+            self._rm(pool, key)
+
+    def rm_prefix(self, pool: str, prefix: str):
+        """Remove all values which keys start with a prefix
+        """
+        for key in self._index.keys(pool, prefix):
+            self.rm(pool, key)
+
+    def _get_held_lock_path(self, pool: str, key: str) -> str:
+        """Get path of a file which marks lock acquired by lock()
+        """
+        h = util.md5_hex_digest(key)
+        return path.join(self._locks_path, pool, 'held', h[:2], h)
+
+    def lock(self, pool: str, key: str, ttl: int) -> bool:
+        """Try to acquire an expiring lock named after the key without waiting
+        """
+        l_path = self._get_held_lock_path(pool, key)
+
+        with self._lock(pool, key):
+            try:
+                fd = os_open(l_path, O_RDONLY)
+                try:
+                    if float(os_read(fd, 32) or 0) > time():
+                        return False
+                finally:
+                    os_close(fd)
+            except (FileNotFoundError, ValueError):
+                pass
+
+            self._write(l_path, str(time() + ttl).encode())
+
+            return True
+
+    def unlock(self, pool: str, key: str):
+        """Release a lock acquired by lock()
+        """
         try:
-            unlink(self._get_key_path(pool, key))
+            unlink(self._get_held_lock_path(pool, key))
         except FileNotFoundError:
             pass
 
+    def sweep(self, pool: str, limit: int) -> int:
+        """Remove at most limit expired items from the pool, returns number of processed items
+        """
+        now = time()
+        expired = self._index.expired(pool, now, limit)
+
+        for key, f_path in expired:
+            with self._lock(pool, key):
+                # Index may be behind the item's file, which is the source of truth
+                try:
+                    raw = self._load(pool, key, True, True)
+                except _error.KeyNotExist:
+                    self._index.rm(pool, key)
+                    continue
+
+                if raw['e'] and raw['e'] <= now:
+                    self._rm(pool, key)
+                    _stats.count(pool, 'expirations')
+                else:
+                    self._index.put(pool, key, f_path, raw['c'], raw['e'], raw['y'])
+
+        return len(expired)
+
     def cleanup(self, pool: str):
         """Cleanup outdated items from the cache
         """
-        for root, dirs, files in walk(path.join(self.path, self._server_name, pool), topdown=False):
-            for name in files:
-                f_path = path.join(root, name)
-                with open(f_path, 'rb') as f:
-                    expires = pickle_load(f.read())['e']
+        self.sweep(pool, -1)
 
-                if expires and expires <= time():
-                    try:
-                        unlink(f_path)
-                    except FileNotFoundError:
-                        pass
+        for key in self._index.of_type(pool, list):
+            with self._lock(pool, key):
+                try:
+                    raw = self._load_check_type(pool, key, list)
+                    if raw.get('s') and self._list_is_fragmented(raw['v']):
+                        self._list_compact(pool, key, raw['v'], raw['t'])
+                except _error.Error:
+                    pass
 
     def clear(self, pool: str):
         """Clear entire pool
         """
+        for d_path in (path.join(self.path, self._server_name, pool), path.join(self._lists_path, pool)):
+            rmtree(d_path, True)
+
+        self._index.clear(pool)
+
+
+class _MemoryItem:
+    """Memory Driver Storage Item
+    """
+    __slots__ = ('value', 'ttl', 'expires', 'size')
+
+    def __init__(self, value: Any, ttl: int = None, size: int = 0):
+        self.value = value
+        self.ttl = ttl
+        self.expires = (time() + ttl) if ttl else None
+        self.size = size
+
+
+class Memory(Abstract):
+    """PytSite In-Process Memory Cache
+
+    Items are kept as live Python objects in a bounded LRU storage, so hashes and lists are modified in place without
+    any serialization. The storage is private to the process, so this driver fits single worker deployments only.
+    """
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None, stats_prefix: str = ''):
+        """Init
+
+        Evictions and expirations are counted in statistics of pools which names are prefixed with stats_prefix.
+        """
+        self._stats_prefix = stats_prefix
+        self._max_entries = max_entries or reg.get('cache.memory_driver_max_entries', 100000)
+        self._max_bytes = max_bytes or reg.get('cache.memory_driver_max_bytes', 64 * 1024 * 1024)
+        self._items = OrderedDict()  # type: Dict[Tuple[str, str], _MemoryItem]
+        self._pools = {}  # type: Dict[str, set]
+        self._size = 0
+        self._held_locks = {}  # type: Dict[Tuple[str, str], float]
+        self._expiry_heaps = {}  # type: Dict[str, List[Tuple[float, str]]]
+        self._lock = RLock()
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        """Estimate size of a value in bytes
+        """
         try:
-            rmtree(path.join(self.path, self._server_name, pool))
-        except FileNotFoundError:
-            pass
+            return len(pickle_dump(value))
+        except (PicklingError, TypeError, AttributeError):
+            return 1024
+
+    def _set(self, pool: str, key: str, item: _MemoryItem) -> _MemoryItem:
+        """Store an item, evicting least recently used ones if necessary
+        """
+        self._del(pool, key)
+
+        self._items[(pool, key)] = item
+        self._pools.setdefault(pool, set()).add(key)
+        self._size += item.size
+        self._evict()
+        self._schedule_expiry(pool, key, item)
+
+        return item
+
+    def _schedule_expiry(self, pool: str, key: str, item: _MemoryItem):
+        """Add an item to the expiry heap
+        """
+        if not item.expires:
+            return
+
+        heap = self._expiry_heaps.setdefault(pool, [])
+
+        # Heap entries of removed or updated items are skipped when popped, rebuild the heap if they are too many
+        if len(heap) > 2 * len(self._pools[pool]) + 1024:
+            items = ((k, self._items[(pool, k)]) for k in self._pools[pool])
+            heap[:] = [(i.expires, k) for k, i in items if i.expires]
+            heapify(heap)
+        else:
+            heappush(heap, (item.expires, key))
+
+    def _del(self, pool: str, key: str) -> Optional[_MemoryItem]:
+        """Delete an item
+        """
+        item = self._items.pop((pool, key), None)
+        if item:
+            self._pools[pool].discard(key)
+            self._size -= item.size
+
+        return item
+
+    def _resize(self, item: _MemoryItem, delta: int):
+        """Update size of an item after in-place modification
+        """
+        item.size += delta
+        self._size += delta
+        self._evict()
+
+    def _evict(self):
+        """Remove least recently used items while storage limits are exceeded
+        """
+        while self._items and (len(self._items) > self._max_entries or self._size > self._max_bytes):
+            (pool, key), item = self._items.popitem(False)
+            self._pools[pool].discard(key)
+            self._size -= item.size
+            _stats.count(self._stats_prefix + pool, 'evictions')
+
+    def _get(self, pool: str, key: str) -> _MemoryItem:
+        """Get an alive item and mark it as recently used
+        """
+        item = self._items.get((pool, key))
+
+        if not item:
+            raise _error.KeyNotExist(pool, key)
+
+        if item.expires and item.expires <= time():
+            self._del(pool, key)
+            _stats.count(self._stats_prefix + pool, 'expirations')
+            raise _error.KeyNotExist(pool, key)
+
+        self._items.move_to_end((pool, key))
+
+        return item
+
+    def _get_check_type(self, pool: str, key: str, expected_type: type) -> _MemoryItem:
+        """Get an alive item and check its value type
+        """
+        item = self._get(pool, key)
+        if not isinstance(item.value, expected_type):
+            raise _error.ValueTypeError(pool, key, item.value)
+
+        return item
+
+    def keys(self, pool: str) -> Generator[str, None, None]:
+        """Get all keys of the pool
+        """
+        with self._lock:
+            keys = list(self._pools.get(pool, ()))
+
+        for key in keys:
+            if self.has(pool, key):
+                yield key
+
+    def has(self, pool: str, key: str) -> bool:
+        """Check whether the pool contains the key
+        """
+        with self._lock:
+            try:
+                self._get(pool, key)
+                return True
+            except _error.KeyNotExist:
+                return False
+
+    def type(self, pool: str, key: str) -> Type:
+        """Get key's value type
+        """
+        with self._lock:
+            return type(self._get(pool, key).value)
+
+    def put(self, pool: str, key: str, value: Any, ttl: int = None) -> Any:
+        """Put an item into the pool
+        """
+        if isinstance(value, (dict, list)):
+            raise _error.ValueTypeError(pool, key, value)
+
+        size = self._sizeof(value)
+        with self._lock:
+            return self._set(pool, key, _MemoryItem(value, ttl, size)).value
+
+    def get(self, pool: str, key: str) -> Any:
+        """Get an item from the pool
+        """
+        with self._lock:
+            value = self._get(pool, key).value
+
+        if isinstance(value, (dict, list)):
+            raise _error.ValueTypeError(pool, key, value)
+
+        return value
+
+    def get_many(self, pool: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several items from the pool, MISSING is returned for not existing keys
+        """
+        r = {}
+        with self._lock:
+            for key in keys:
+                try:
+                    r[key] = self._get(pool, key).value
+                except _error.KeyNotExist:
+                    r[key] = MISSING
+                    continue
+
+                if isinstance(r[key], (dict, list)):
+                    raise _error.ValueTypeError(pool, key, r[key])
+
+        return r
+
+    def put_many(self, pool: str, items: Mapping[str, Any], ttl: int = None):
+        """Put several items into the pool
+        """
+        for key, value in items.items():
+            if isinstance(value, (dict, list)):
+                raise _error.ValueTypeError(pool, key, value)
+
+        sizes = {key: self._sizeof(value) for key, value in items.items()}
+        with self._lock:
+            for key, value in items.items():
+                self._set(pool, key, _MemoryItem(value, ttl, sizes[key]))
+
+    def has_many(self, pool: str, keys: Iterable[str]) -> Dict[str, bool]:
+        """Check whether the pool contains several keys
+        """
+        with self._lock:
+            return super().has_many(pool, keys)
+
+    def rm_many(self, pool: str, keys: Iterable[str]):
+        """Remove several values from the pool
+        """
+        with self._lock:
+            for key in keys:
+                self._del(pool, key)
+
+    def put_hash(self, pool: str, key: str, value: Mapping, ttl: int = None) -> Any:
+        """Put a hash item into the pool
+        """
+        if not isinstance(value, Mapping):
+            raise _error.ValueTypeError(pool, key, value)
+
+        value = dict(value)
+        size = self._sizeof(value)
+        with self._lock:
+            self._set(pool, key, _MemoryItem(value, ttl, size))
+
+        return dict(value)
+
+    def put_hash_item(self, pool: str, key: str, item_key: str, value: Any, ttl: int = None) -> Any:
+        """Put a value into a hash
+        """
+        size = self._sizeof(item_key) + self._sizeof(value)
+        with self._lock:
+            try:
+                item = self._get_check_type(pool, key, dict)
+                if item_key in item.value:
+                    size -= self._sizeof(item_key) + self._sizeof(item.value[item_key])
+                item.value[item_key] = value
+                self._resize(item, size)
+                return dict(item.value)
+
+            except _error.KeyNotExist:
+                return dict(self._set(pool, key, _MemoryItem({item_key: value}, ttl, size)).value)
+
+    def get_hash(self, pool: str, key: str, hash_keys: List[str] = None) -> dict:
+        """Get hash
+        """
+        with self._lock:
+            val = self._get_check_type(pool, key, dict).value
+
+            return {k: v for k, v in val.items() if k in hash_keys} if hash_keys else dict(val)
+
+    def get_hash_item(self, pool: str, key: str, item_key: str, default=None) -> Any:
+        """Get a value from a hash
+        """
+        with self._lock:
+            return self._get_check_type(pool, key, dict).value.get(item_key, default)
+
+    def rm_hash_item(self, pool: str, key: str, item_key: str) -> Any:
+        """Remove a value from a hash
+        """
+        with self._lock:
+            item = self._get_check_type(pool, key, dict)
+            if item_key in item.value:
+                self._resize(item, -(self._sizeof(item_key) + self._sizeof(item.value.pop(item_key))))
+
+            return dict(item.value)
+
+    def list_len(self, pool: str, key: str) -> int:
+        """Return the length of the list stored at key
+        """
+        with self._lock:
+            return len(self._get_check_type(pool, key, list).value)
+
+    def get_list(self, pool: str, key: str, start: int = 0, end: int = None) -> list:
+        """Return the specified elements of the list stored at key
+        """
+        with self._lock:
+            return self._get_check_type(pool, key, list).value[start:end]
+
+    def put_list(self, pool, key: str, value: list, ttl: int = None) -> list:
+        """Store a list
+        """
+        if not isinstance(value, list):
+            raise _error.ValueTypeError(pool, key, value)
+
+        value = list(value)
+        size = self._sizeof(value)
+        with self._lock:
+            self._set(pool, key, _MemoryItem(value, ttl, size))
+
+        return list(value)
+
+    def _list_push(self, pool: str, key: str, value: Any, ttl: int, index: Optional[int]) -> int:
+        """Insert the value into the list stored at key
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            try:
+                item = self._get_check_type(pool, key, list)
+                item.value.append(value) if index is None else item.value.insert(index, value)
+                length = len(item.value)
+                self._resize(item, size)
+                return length
+
+            except _error.KeyNotExist:
+                self._set(pool, key, _MemoryItem([value], ttl, size))
+                return 1
+
+    def list_l_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
+        """Insert the value at the head of the list stored at key
+        """
+        return self._list_push(pool, key, value, ttl, 0)
+
+    def list_r_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
+        """Insert the value at the tail of the list stored at key
+        """
+        return self._list_push(pool, key, value, ttl, None)
+
+    def _list_pop(self, pool: str, key: str, index: int) -> Any:
+        """Remove and return an element of the list stored at key
+        """
+        with self._lock:
+            item = self._get_check_type(pool, key, list)
+            r = item.value.pop(index)
+            self._resize(item, -self._sizeof(r)) if item.value else self._del(pool, key)
+
+            return r
+
+    def list_l_pop(self, pool: str, key: str) -> Any:
+        """Remove and return the first element of the list stored at key
+        """
+        return self._list_pop(pool, key, 0)
+
+    def list_r_pop(self, pool: str, key: str) -> Any:
+        """Remove and return the last element of the list stored at key
+        """
+        return self._list_pop(pool, key, -1)
+
+    def expire(self, pool: str, key: str, ttl: int):
+        """Set a timeout on key
+        """
+        with self._lock:
+            item = self._get(pool, key)
+            item.ttl = ttl
+            item.expires = (time() + ttl) if ttl else None
+            self._schedule_expiry(pool, key, item)
+
+    def ttl(self, pool: str, key: str) -> Optional[int]:
+        """Get remaining time to live of a key
+        """
+        with self._lock:
+            expires = self._get(pool, key).expires
+
+        return int(expires - time()) if expires else None
+
+    def rnm(self, pool: str, key: str, new_key: str):
+        """Rename a key
+        """
+        with self._lock:
+            item = self._get(pool, key)
+            self._del(pool, key)
+            self._set(pool, new_key, item)
+
+    def rm(self, pool: str, key: str):
+        """Remove a value from the pool
+        """
+        with self._lock:
+            self._del(pool, key)
+
+    def lock(self, pool: str, key: str, ttl: int) -> bool:
+        """Try to acquire an expiring lock named after the key without waiting
+        """
+        now = time()
+        with self._lock:
+            if self._held_locks.get((pool, key), 0) > now:
+                return False
+
+            self._held_locks[(pool, key)] = now + ttl
+
+            return True
+
+    def unlock(self, pool: str, key: str):
+        """Release a lock acquired by lock()
+        """
+        with self._lock:
+            self._held_locks.pop((pool, key), None)
+
+    def sweep(self, pool: str, limit: int) -> int:
+        """Remove at most limit expired items from the pool, returns number of processed items
+        """
+        now = time()
+        n = 0
+        with self._lock:
+            heap = self._expiry_heaps.get(pool, [])
+            while heap and heap[0][0] <= now and n != limit:
+                expires, key = heappop(heap)
+                n += 1
+                item = self._items.get((pool, key))
+                if item and item.expires == expires:
+                    self._del(pool, key)
+                    _stats.count(self._stats_prefix + pool, 'expirations')
+
+        return n
+
+    def cleanup(self, pool: str):
+        """Cleanup outdated items from the pool
+        """
+        now = time()
+        with self._lock:
+            for key in list(self._pools.get(pool, ())):
+                item = self._items[(pool, key)]
+                if item.expires and item.expires <= now:
+                    self._del(pool, key)
+                    _stats.count(self._stats_prefix + pool, 'expirations')
+
+    def clear(self, pool: str):
+        """Clear entire pool
+        """
+        with self._lock:
+            for key in list(self._pools.get(pool, ())):
+                self._del(pool, key)
+            self._expiry_heaps.pop(pool, None)
+
+
+class TwoTier(Abstract):
+    """PytSite Two-Tier Cache
+
+    Wraps any driver with a short living per-process memory cache. Reads are served from memory when possible, including
+    negative results, and writes go through to the wrapped driver, which remains the source of truth. Changes made by
+    other processes become visible at most after `l1_ttl` seconds.
+    """
+
+    def __init__(self, backend: Abstract, l1_ttl: int = None, l1: Memory = None):
+        """Init
+        """
+        if not isinstance(backend, Abstract):
+            raise TypeError('Instance of {} expected, got {}'.format(Abstract, type(backend)))
+
+        self._backend = backend
+        self._l1_ttl = l1_ttl or reg.get('cache.two_tier_driver_ttl', 5)
+        self._l1 = l1 or Memory(stats_prefix='l1:')
+
+    @property
+    def backend(self) -> Abstract:
+        """Get wrapped driver
+        """
+        return self._backend
+
+    def _l1_get(self, pool: str, key: str) -> Optional[tuple]:
+        """Get an entry from the first level cache
+        """
+        try:
+            return self._l1.get(pool, key)
+        except _error.KeyNotExist:
+            return None
+
+    def _l1_put(self, pool: str, key: str, kind: str, value: Any = None, ttl: int = None):
+        """Put an entry into the first level cache
+        """
+        self._l1.put(pool, key, (kind, value), min(ttl, self._l1_ttl) if ttl else self._l1_ttl)
+
+    def _l1_load(self, pool: str, key: str, kind: str) -> Any:
+        """Get a value of expected kind from the first level cache, loading it from the backend if necessary
+        """
+        entry = self._l1_get(pool, key)
+
+        if entry:
+            if entry[0] == 'm':
+                raise _error.KeyNotExist(pool, key)
+            if entry[0] == kind:
+                return entry[1]
+            if entry[0] != 'e':
+                raise _error.ValueTypeError(pool, key, entry[1])
+
+        try:
+            if kind == 'h':
+                value = self._backend.get_hash(pool, key)
+            elif kind == 'l':
+                value = self._backend.get_list(pool, key)
+            else:
+                value = self._backend.get(pool, key)
+        except _error.KeyNotExist:
+            self._l1_put(pool, key, 'm')
+            raise
+
+        self._l1_put(pool, key, kind, value)
+
+        return value
+
+    def keys(self, pool: str) -> Generator[str, None, None]:
+        """Get all keys of the pool
+        """
+        return self._backend.keys(pool)
+
+    def scan(self, pool: str, prefix: str) -> Generator[str, None, None]:
+        """Get keys of the pool which start with a prefix
+        """
+        return self._backend.scan(pool, prefix)
+
+    def has(self, pool: str, key: str) -> bool:
+        """Check whether the pool contains the key
+        """
+        entry = self._l1_get(pool, key)
+        if entry:
+            return entry[0] != 'm'
+
+        r = self._backend.has(pool, key)
+        self._l1_put(pool, key, 'e' if r else 'm')
+
+        return r
+
+    def type(self, pool: str, key: str) -> Type:
+        """Get key's value type
+        """
+        entry = self._l1_get(pool, key)
+        if entry:
+            if entry[0] == 'm':
+                raise _error.KeyNotExist(pool, key)
+            if entry[0] != 'e':
+                return type(entry[1])
+
+        return self._backend.type(pool, key)
+
+    def put(self, pool: str, key: str, value: Any, ttl: int = None) -> Any:
+        """Put an item into the pool
+        """
+        r = self._backend.put(pool, key, value, ttl)
+        self._l1_put(pool, key, 'v', value, ttl)
+
+        return r
+
+    def get(self, pool: str, key: str) -> Any:
+        """Get an item from the pool
+        """
+        return self._l1_load(pool, key, 'v')
+
+    def get_many(self, pool: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several items from the pool, MISSING is returned for not existing keys
+        """
+        r = {}
+        misses = []
+        for key, entry in self._l1.get_many(pool, keys).items():
+            if entry is MISSING or entry[0] == 'e':
+                misses.append(key)
+            elif entry[0] == 'm':
+                r[key] = MISSING
+            elif entry[0] == 'v':
+                r[key] = entry[1]
+            else:
+                raise _error.ValueTypeError(pool, key, entry[1])
+
+        if misses:
+            for key, value in self._backend.get_many(pool, misses).items():
+                self._l1_put(pool, key, 'm') if value is MISSING else self._l1_put(pool, key, 'v', value)
+                r[key] = value
+
+        return r
+
+    def put_many(self, pool: str, items: Mapping[str, Any], ttl: int = None):
+        """Put several items into the pool
+        """
+        self._backend.put_many(pool, items, ttl)
+        for key, value in items.items():
+            self._l1_put(pool, key, 'v', value, ttl)
+
+    def has_many(self, pool: str, keys: Iterable[str]) -> Dict[str, bool]:
+        """Check whether the pool contains several keys
+        """
+        r = {}
+        misses = []
+        for key, entry in self._l1.get_many(pool, keys).items():
+            if entry is MISSING:
+                misses.append(key)
+            else:
+                r[key] = entry[0] != 'm'
+
+        if misses:
+            for key, exists in self._backend.has_many(pool, misses).items():
+                self._l1_put(pool, key, 'e' if exists else 'm')
+                r[key] = exists
+
+        return r
+
+    def rm_many(self, pool: str, keys: Iterable[str]):
+        """Remove several values from the pool
+        """
+        keys = list(keys)
+        try:
+            return self._backend.rm_many(pool, keys)
+        finally:
+            for key in keys:
+                self._l1_put(pool, key, 'm')
+
+    def put_hash(self, pool: str, key: str, value: Mapping, ttl: int = None) -> Any:
+        """Put a hash item into the pool
+        """
+        r = self._backend.put_hash(pool, key, value, ttl)
+        self._l1_put(pool, key, 'h', dict(value), ttl)
+
+        return r
+
+    def put_hash_item(self, pool: str, key: str, item_key: str, value: Any, ttl: int = None) -> Any:
+        """Put a value into a hash
+        """
+        try:
+            return self._backend.put_hash_item(pool, key, item_key, value, ttl)
+        finally:
+            self._l1.rm(pool, key)
+
+    def get_hash(self, pool: str, key: str, hash_keys: List[str] = None) -> dict:
+        """Get hash
+        """
+        val = self._l1_load(pool, key, 'h')
+
+        return {k: v for k, v in val.items() if k in hash_keys} if hash_keys else dict(val)
+
+    def get_hash_item(self, pool: str, key: str, item_key: str, default=None) -> Any:
+        """Get a value from a hash
+        """
+        return self._l1_load(pool, key, 'h').get(item_key, default)
+
+    def rm_hash_item(self, pool: str, key: str, item_key: str) -> Any:
+        """Remove a value from a hash
+        """
+        try:
+            return self._backend.rm_hash_item(pool, key, item_key)
+        finally:
+            self._l1.rm(pool, key)
+
+    def list_len(self, pool: str, key: str) -> int:
+        """Return the length of the list stored at key
+        """
+        return len(self._l1_load(pool, key, 'l'))
+
+    def get_list(self, pool: str, key: str, start: int = 0, end: int = None) -> list:
+        """Return the specified elements of the list stored at key
+        """
+        return self._l1_load(pool, key, 'l')[start:end]
+
+    def put_list(self, pool, key: str, value: list, ttl: int = None) -> list:
+        """Store a list
+        """
+        r = self._backend.put_list(pool, key, value, ttl)
+        self._l1_put(pool, key, 'l', list(value), ttl)
+
+        return r
+
+    def list_l_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
+        """Insert the value at the head of the list stored at key
+        """
+        try:
+            return self._backend.list_l_push(pool, key, value, ttl)
+        finally:
+            self._l1.rm(pool, key)
+
+    def list_r_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
+        """Insert the value at the tail of the list stored at key
+        """
+        try:
+            return self._backend.list_r_push(pool, key, value, ttl)
+        finally:
+            self._l1.rm(pool, key)
+
+    def list_l_pop(self, pool: str, key: str) -> Any:
+        """Remove and return the first element of the list stored at key
+        """
+        try:
+            return self._backend.list_l_pop(pool, key)
+        finally:
+            self._l1.rm(pool, key)
+
+    def list_r_pop(self, pool: str, key: str) -> Any:
+        """Remove and return the last element of the list stored at key
+        """
+        try:
+            return self._backend.list_r_pop(pool, key)
+        finally:
+            self._l1.rm(pool, key)
+
+    def expire(self, pool: str, key: str, ttl: int):
+        """Set a timeout on key
+        """
+        try:
+            return self._backend.expire(pool, key, ttl)
+        finally:
+            self._l1.rm(pool, key)
+
+    def ttl(self, pool: str, key: str) -> Optional[int]:
+        """Get remaining time to live of a key
+        """
+        return self._backend.ttl(pool, key)
+
+    def rnm(self, pool: str, key: str, new_key: str):
+        """Rename a key
+        """
+        try:
+            return self._backend.rnm(pool, key, new_key)
+        finally:
+            self._l1.rm(pool, key)
+            self._l1.rm(pool, new_key)
+
+    def rm(self, pool: str, key: str):
+        """Remove a value from the pool
+        """
+        try:
+            return self._backend.rm(pool, key)
+        finally:
+            self._l1_put(pool, key, 'm')
+
+    def rm_prefix(self, pool: str, prefix: str):
+        """Remove all values which keys start with a prefix
+        """
+        try:
+            return self._backend.rm_prefix(pool, prefix)
+        finally:
+            self._l1.rm_prefix(pool, prefix)
+
+    def lock(self, pool: str, key: str, ttl: int) -> bool:
+        """Try to acquire an expiring lock named after the key without waiting
+        """
+        return self._backend.lock(pool, key, ttl)
+
+    def unlock(self, pool: str, key: str):
+        """Release a lock acquired by lock()
+        """
+        return self._backend.unlock(pool, key)
+
+    def sweep(self, pool: str, limit: int) -> int:
+        """Remove at most limit expired items from the pool, returns number of processed items
+        """
+        self._l1.sweep(pool, limit)
+
+        return self._backend.sweep(pool, limit)
+
+    def cleanup(self, pool: str):
+        """Cleanup outdated items from the pool
+        """
+        self._l1.cleanup(pool)
+
+        return self._backend.cleanup(pool)
+
+    def clear(self, pool: str):
+        """Clear entire pool
+        """
+        try:
+            return self._backend.clear(pool)
+        finally:
+            self._l1.clear(pool)
+
+
+def move_key(src: Abstract, dst: Abstract, pool: str, key: str) -> bool:
+    """Move a key with its value and TTL from one driver to another
+
+    Returns False if the key does not exist or has expired.
+    """
+    try:
+        ttl = src.ttl(pool, key)
+        if ttl is not None and ttl <= 0:
+            src.rm(pool, key)
+            return False
+
+        value_type = src.type(pool, key)
+        if value_type in (list, tuple):
+            dst.put_list(pool, key, list(src.get_list(pool, key)), ttl)
+        elif value_type is dict:
+            dst.put_hash(pool, key, src.get_hash(pool, key), ttl)
+        else:
+            dst.put(pool, key, src.get(pool, key), ttl)
+
+    except _error.KeyNotExist:
+        return False
+
+    src.rm(pool, key)
+
+    return True
+
+
+class Migrating(Abstract):
+    """PytSite Migrating Cache
+
+    Temporary driver used while keys are being moved from one driver to another. All writes go to the new driver. Keys
+    not found in the new driver are moved from the old one on first access, so the cache stays warm while the rest of
+    keys is being moved in background.
+    """
+
+    def __init__(self, old: Abstract, new: Abstract):
+        """Init
+        """
+        self._old = old
+        self._new = new
+        self._locks = [RLock() for _ in range(64)]
+
+    @property
+    def old(self) -> Abstract:
+        """Get driver keys are moved from
+        """
+        return self._old
+
+    @property
+    def new(self) -> Abstract:
+        """Get driver keys are moved to
+        """
+        return self._new
+
+    @contextmanager
+    def _lock(self, pool: str, key: str):
+        """Serialize moving and modification of a key within current process
+        """
+        with self._locks[hash((pool, key)) % len(self._locks)]:
+            yield
+
+    def move(self, pool: str, key: str) -> bool:
+        """Move a key from the old driver unless it already exists in the new one
+        """
+        with self._lock(pool, key):
+            if self._new.has(pool, key):
+                # Value from the new driver is more recent
+                self._old.rm(pool, key)
+                return False
+
+            return move_key(self._old, self._new, pool, key)
+
+    def _read(self, pool: str, key: str, method: str, *args) -> Any:
+        """Read from the new driver, moving the key from the old one if necessary
+        """
+        try:
+            return getattr(self._new, method)(pool, key, *args)
+        except _error.KeyNotExist:
+            if not self.move(pool, key):
+                raise
+
+        return getattr(self._new, method)(pool, key, *args)
+
+    def _modify(self, pool: str, key: str, method: str, *args) -> Any:
+        """Modify a key in the new driver, moving it from the old one before
+        """
+        with self._lock(pool, key):
+            if not self._new.has(pool, key):
+                move_key(self._old, self._new, pool, key)
+
+            return getattr(self._new, method)(pool, key, *args)
+
+    def _replace(self, pool: str, key: str, method: str, *args) -> Any:
+        """Overwrite a key in the new driver, dropping it from the old one
+        """
+        with self._lock(pool, key):
+            self._old.rm(pool, key)
+
+            return getattr(self._new, method)(pool, key, *args)
+
+    def keys(self, pool: str) -> Generator[str, None, None]:
+        """Get all keys of the pool
+        """
+        seen = set()
+        for driver in (self._new, self._old):
+            for key in driver.keys(pool):
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def scan(self, pool: str, prefix: str) -> Generator[str, None, None]:
+        """Get keys of the pool which start with a prefix
+        """
+        seen = set()
+        for driver in (self._new, self._old):
+            for key in driver.scan(pool, prefix):
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def has(self, pool: str, key: str) -> bool:
+        """Check whether a key exists in the pool
+        """
+        return self._new.has(pool, key) or self._old.has(pool, key)
+
+    def type(self, pool: str, key: str) -> Type:
+        """Get key's value type
+        """
+        return self._read(pool, key, 'type')
+
+    def put(self, pool: str, key: str, value: Any, ttl: int = None) -> Any:
+        """Put a value into the pool
+        """
+        return self._replace(pool, key, 'put', value, ttl)
+
+    def get(self, pool: str, key: str) -> Any:
+        """Get a value from the pool
+        """
+        return self._read(pool, key, 'get')
+
+    def put_hash(self, pool: str, key: str, value: Mapping, ttl: int = None) -> Any:
+        """Put a hash value into the pool
+        """
+        return self._replace(pool, key, 'put_hash', value, ttl)
+
+    def put_hash_item(self, pool: str, key: str, item_key: str, value: Any, ttl: int = None) -> Any:
+        """Put a value into a hash
+        """
+        return self._modify(pool, key, 'put_hash_item', item_key, value, ttl)
+
+    def get_hash(self, pool: str, key: str, hash_keys: List[str] = None) -> Mapping:
+        """Get a hash value from the pool
+        """
+        return self._read(pool, key, 'get_hash', hash_keys)
+
+    def get_hash_item(self, pool: str, key: str, item_key: str, default=None) -> Any:
+        """Get a value from a hash
+        """
+        return self._read(pool, key, 'get_hash_item', item_key, default)
+
+    def rm_hash_item(self, pool: str, key: str, item_key: str) -> Any:
+        """Remove a value from a hash
+        """
+        return self._modify(pool, key, 'rm_hash_item', item_key)
+
+    def list_len(self, pool: str, key: str) -> int:
+        """Return the length of the list stored at key
+        """
+        return self._read(pool, key, 'list_len')
+
+    def get_list(self, pool: str, key: str, start: int = 0, end: int = None) -> list:
+        """Return the specified elements of the list stored at key
+        """
+        return self._read(pool, key, 'get_list', start, end)
+
+    def put_list(self, pool, key: str, value: list, ttl: int = None) -> list:
+        """Put a list value into the pool
+        """
+        return self._replace(pool, key, 'put_list', value, ttl)
+
+    def list_l_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
+        """Insert the value at the head of the list stored at key
+        """
+        return self._modify(pool, key, 'list_l_push', value, ttl)
+
+    def list_r_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
+        """Insert the value at the tail of the list stored at key
+        """
+        return self._modify(pool, key, 'list_r_push', value, ttl)
+
+    def list_l_pop(self, pool: str, key: str) -> Any:
+        """Remove and return the first element of the list stored at key
+        """
+        return self._modify(pool, key, 'list_l_pop')
+
+    def list_r_pop(self, pool: str, key: str) -> Any:
+        """Remove and return the last element of the list stored at key
+        """
+        return self._modify(pool, key, 'list_r_pop')
+
+    def expire(self, pool: str, key: str, ttl: int) -> int:
+        """Set a timeout on key
+        """
+        return self._modify(pool, key, 'expire', ttl)
+
+    def ttl(self, pool: str, key: str) -> Optional[int]:
+        """Get remaining time to live of a key
+        """
+        return self._read(pool, key, 'ttl')
+
+    def rnm(self, pool: str, key: str, new_key: str):
+        """Rename a key
+        """
+        with self._lock(pool, new_key):
+            self._old.rm(pool, new_key)
+
+        return self._modify(pool, key, 'rnm', new_key)
+
+    def rm(self, pool: str, key: str):
+        """Remove a value from the pool
+        """
+        with self._lock(pool, key):
+            self._old.rm(pool, key)
+            self._new.rm(pool, key)
+
+    def rm_prefix(self, pool: str, prefix: str):
+        """Remove all values which keys start with a prefix
+        """
+        self._old.rm_prefix(pool, prefix)
+        self._new.rm_prefix(pool, prefix)
+
+    def lock(self, pool: str, key: str, ttl: int) -> bool:
+        """Try to acquire an expiring lock named after the key without waiting
+        """
+        return self._new.lock(pool, key, ttl)
+
+    def unlock(self, pool: str, key: str):
+        """Release a lock acquired by lock()
+        """
+        return self._new.unlock(pool, key)
+
+    def sweep(self, pool: str, limit: int) -> int:
+        """Remove at most limit expired items from the pool, returns number of processed items
+        """
+        return self._new.sweep(pool, limit)
+
+    def cleanup(self, pool: str):
+        """Cleanup outdated items from the pool
+        """
+        self._new.cleanup(pool)
+
+    def clear(self, pool: str):
+        """Clear entire pool
+        """
+        self._old.clear(pool)
+        self._new.clear(pool)
+
+
+# Redis cannot store empty hashes and lists, so hashes always contain a field which is not returned and empty lists are
+# replaced by a marker
+_REDIS_HASH_SENTINEL = '\x00'
+_REDIS_EMPTY_LIST = b'\x00pytsite.cache:empty_list'
+
+
+class Redis(Abstract):
+    """PytSite Redis Cache
+
+    Stores items on a Redis compatible server, so the cache is shared between processes and nodes. Hashes and lists are
+    mapped onto native Redis hashes and lists, which makes their item operations atomic. Requires the `redis` package.
+    """
+
+    def __init__(self, host: str = None, port: int = None, db: int = None, password: str = None,
+                 max_connections: int = None, client=None):
+        """Init
+        """
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Package 'redis' is required by the Redis cache driver")
+
+        if client is None:
+            client = redis.Redis(connection_pool=redis.BlockingConnectionPool(
+                host=host or reg.get('cache.redis_driver_host', 'localhost'),
+                port=port or reg.get('cache.redis_driver_port', 6379),
+                db=db or reg.get('cache.redis_driver_db', 0),
+                password=password or reg.get('cache.redis_driver_password'),
+                max_connections=max_connections or reg.get('cache.redis_driver_max_connections', 50),
+                timeout=reg.get('cache.redis_driver_timeout', 20),
+            ))
+
+        if not reg.get('cache.redis_driver_prefix'):
+            from pytsite import router
+            prefix = router.server_name()
+        else:
+            prefix = reg.get('cache.redis_driver_prefix')
+
+        self._client = client
+        self._response_error = redis.ResponseError
+        self._prefix = prefix
+
+    @property
+    def client(self):
+        """Get Redis client
+        """
+        return self._client
+
+    def _k(self, pool: str, key: str) -> str:
+        """Get key's name on the server
+
+        Pool's name is prefixed with its length, so names of pools which contain colons are unambiguous.
+        """
+        return '{}:{}:{}:{}'.format(self._prefix, len(pool), pool, key)
+
+    def _lock_k(self, pool: str, key: str) -> str:
+        """Get lock's name on the server
+        """
+        return '{}:__lock__:{}:{}:{}'.format(self._prefix, len(pool), pool, key)
+
+    def _is_empty_list(self, k: str) -> bool:
+        """Check whether the key holds an empty list marker
+        """
+        try:
+            return self._client.get(k) == _REDIS_EMPTY_LIST
+        except self._response_error:
+            return False
+
+    def _pool_pattern(self, pool: str, prefix: str = '') -> str:
+        """Get keys match pattern of the pool
+        """
+        prefix = self._k(pool, prefix)
+        for c in '\\*?[]':
+            prefix = prefix.replace(c, '\\' + c)
+
+        return prefix + '*'
+
+    def _type_error(self, pool: str, key: str) -> _error.ValueTypeError:
+        """Build value type error for the key
+        """
+        try:
+            return _error.ValueTypeError(pool, key, self.type(pool, key)())
+        except (_error.KeyNotExist, TypeError):
+            return _error.ValueTypeError(pool, key, None)
+
+    def _execute(self, pool: str, key: str, pipe) -> list:
+        """Execute a pipeline
+        """
+        try:
+            return pipe.execute()
+        except self._response_error as e:
+            if 'WRONGTYPE' in str(e):
+                raise self._type_error(pool, key)
+            raise e
+
+    def keys(self, pool: str) -> Generator[str, None, None]:
+        """Get all keys of the pool
+        """
+        prefix_len = len(self._k(pool, '').encode())
+        for k in self._client.scan_iter(match=self._pool_pattern(pool), count=1000):
+            yield k[prefix_len:].decode()
+
+    def scan(self, pool: str, prefix: str) -> Generator[str, None, None]:
+        """Get keys of the pool which start with a prefix
+        """
+        prefix_len = len(self._k(pool, '').encode())
+        for k in self._client.scan_iter(match=self._pool_pattern(pool, prefix), count=1000):
+            yield k[prefix_len:].decode()
+
+    def has(self, pool: str, key: str) -> bool:
+        """Check whether the pool contains the key
+        """
+        return bool(self._client.exists(self._k(pool, key)))
+
+    def type(self, pool: str, key: str) -> Type:
+        """Get key's value type
+        """
+        k = self._k(pool, key)
+        t = self._client.type(k)
+
+        if t == b'hash':
+            return dict
+        elif t == b'list':
+            return list
+        elif t == b'string':
+            value = self._client.get(k)
+            if value == _REDIS_EMPTY_LIST:
+                return list
+            if value is not None:
+                return type(pickle_load(value))
+
+        raise _error.KeyNotExist(pool, key)
+
+    def put(self, pool: str, key: str, value: Any, ttl: int = None) -> Any:
+        """Put an item into the pool
+        """
+        if isinstance(value, (dict, list)):
+            raise _error.ValueTypeError(pool, key, value)
+
+        data = pickle_dump(value)
+        self._client.set(self._k(pool, key), data, ex=ttl or None)
+        _stats.count(pool, 'bytes_written', len(data))
+
+        return value
+
+    def get(self, pool: str, key: str) -> Any:
+        """Get an item from the pool
+        """
+        try:
+            value = self._client.get(self._k(pool, key))
+        except self._response_error:
+            raise self._type_error(pool, key)
+
+        if value is None:
+            raise _error.KeyNotExist(pool, key)
+
+        if value == _REDIS_EMPTY_LIST:
+            raise _error.ValueTypeError(pool, key, [])
+
+        _stats.count(pool, 'bytes_read', len(value))
+
+        return pickle_load(value)
+
+    def get_many(self, pool: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several items from the pool, MISSING is returned for not existing keys
+        """
+        keys = list(keys)
+        pipe = self._client.pipeline(False)
+        for key in keys:
+            pipe.get(self._k(pool, key))
+
+        r = {}
+        for key, value in zip(keys, pipe.execute(False)):
+            if isinstance(value, self._response_error) or value == _REDIS_EMPTY_LIST:
+                raise self._type_error(pool, key)
+            r[key] = MISSING if value is None else pickle_load(value)
+
+        return r
+
+    def put_many(self, pool: str, items: Mapping[str, Any], ttl: int = None):
+        """Put several items into the pool
+        """
+        pipe = self._client.pipeline(False)
+        for key, value in items.items():
+            if isinstance(value, (dict, list)):
+                raise _error.ValueTypeError(pool, key, value)
+            pipe.set(self._k(pool, key), pickle_dump(value), ex=ttl or None)
+
+        pipe.execute()
+
+    def has_many(self, pool: str, keys: Iterable[str]) -> Dict[str, bool]:
+        """Check whether the pool contains several keys
+        """
+        keys = list(keys)
+        pipe = self._client.pipeline(False)
+        for key in keys:
+            pipe.exists(self._k(pool, key))
+
+        return {key: bool(r) for key, r in zip(keys, pipe.execute())}
+
+    def rm_many(self, pool: str, keys: Iterable[str]):
+        """Remove several values from the pool
+        """
+        keys = [self._k(pool, key) for key in keys]
+        if keys:
+            self._client.delete(*keys)
+
+    def put_hash(self, pool: str, key: str, value: Mapping, ttl: int = None) -> Any:
+        """Put a hash item into the pool
+        """
+        if not isinstance(value, Mapping):
+            raise _error.ValueTypeError(pool, key, value)
+
+        k = self._k(pool, key)
+        mapping = {h_k: pickle_dump(h_v) for h_k, h_v in value.items()}
+        mapping[_REDIS_HASH_SENTINEL] = b''
+        pipe = self._client.pipeline()
+        pipe.delete(k)
+        pipe.hset(k, mapping=mapping)
+        if ttl:
+            pipe.expire(k, ttl)
+        pipe.execute()
+
+        return dict(value)
+
+    def put_hash_item(self, pool: str, key: str, item_key: str, value: Any, ttl: int = None) -> Any:
+        """Put a value into a hash
+        """
+        k = self._k(pool, key)
+        pipe = self._client.pipeline()
+        pipe.exists(k)
+        pipe.hset(k, mapping={item_key: pickle_dump(value), _REDIS_HASH_SENTINEL: b''})
+        pipe.hgetall(k)
+        existed, _, values = self._execute(pool, key, pipe)
+
+        if not existed and ttl:
+            self._client.expire(k, ttl)
+
+        return self._hash_decode(values)
+
+    def get_hash(self, pool: str, key: str, hash_keys: List[str] = None) -> dict:
+        """Get hash
+        """
+        k = self._k(pool, key)
+        pipe = self._client.pipeline(False)
+        pipe.exists(k)
+        if hash_keys:
+            pipe.hmget(k, hash_keys)
+        else:
+            pipe.hgetall(k)
+        exists, values = self._execute(pool, key, pipe)
+
+        if not exists:
+            raise _error.KeyNotExist(pool, key)
+
+        if hash_keys:
+            return {h_k: pickle_load(h_v) for h_k, h_v in zip(hash_keys, values)
+                    if h_v is not None and h_k != _REDIS_HASH_SENTINEL}
+
+        return self._hash_decode(values)
+
+    @staticmethod
+    def _hash_decode(values: Mapping[bytes, bytes]) -> dict:
+        """Decode hash's fields, skipping the sentinel one
+        """
+        return {h_k.decode(): pickle_load(h_v) for h_k, h_v in values.items()
+                if h_k != _REDIS_HASH_SENTINEL.encode()}
+
+    def get_hash_item(self, pool: str, key: str, item_key: str, default=None) -> Any:
+        """Get a value from a hash
+        """
+        k = self._k(pool, key)
+        pipe = self._client.pipeline(False)
+        pipe.exists(k)
+        pipe.hget(k, item_key)
+        exists, value = self._execute(pool, key, pipe)
+
+        if not exists:
+            raise _error.KeyNotExist(pool, key)
+
+        return default if value is None or item_key == _REDIS_HASH_SENTINEL else pickle_load(value)
+
+    def rm_hash_item(self, pool: str, key: str, item_key: str) -> Any:
+        """Remove a value from a hash
+        """
+        if item_key == _REDIS_HASH_SENTINEL:
+            return self.get_hash(pool, key)
+
+        k = self._k(pool, key)
+        pipe = self._client.pipeline()
+        pipe.exists(k)
+        pipe.hdel(k, item_key)
+        pipe.hgetall(k)
+        exists, _, values = self._execute(pool, key, pipe)
+        if not exists:
+            raise _error.KeyNotExist(pool, key)
+
+        return self._hash_decode(values)
+
+    def list_len(self, pool: str, key: str) -> int:
+        """Return the length of the list stored at key
+        """
+        k = self._k(pool, key)
+        try:
+            length = self._client.llen(k)
+        except self._response_error:
+            if self._is_empty_list(k):
+                return 0
+            raise self._type_error(pool, key)
+
+        if not length:
+            raise _error.KeyNotExist(pool, key)
+
+        return length
+
+    def get_list(self, pool: str, key: str, start: int = 0, end: int = None) -> list:
+        """Return the specified elements of the list stored at key
+        """
+        k = self._k(pool, key)
+        pipe = self._client.pipeline(False)
+        pipe.exists(k)
+        pipe.lrange(k, start, -1 if end is None else end - 1)
+        try:
+            exists, values = self._execute(pool, key, pipe)
+        except _error.ValueTypeError:
+            if self._is_empty_list(k):
+                return []
+            raise
+
+        if not exists:
+            raise _error.KeyNotExist(pool, key)
+
+        return [pickle_load(v) for v in values] if end != 0 else []
+
+    def put_list(self, pool, key: str, value: list, ttl: int = None) -> list:
+        """Store a list
+        """
+        if not isinstance(value, list):
+            raise _error.ValueTypeError(pool, key, value)
+
+        k = self._k(pool, key)
+        pipe = self._client.pipeline()
+        pipe.delete(k)
+        if value:
+            pipe.rpush(k, *[pickle_dump(v) for v in value])
+            if ttl:
+                pipe.expire(k, ttl)
+        else:
+            pipe.set(k, _REDIS_EMPTY_LIST, ex=ttl or None)
+        pipe.execute()
+
+        return value
+
+    def _list_push(self, pool: str, key: str, value: Any, ttl: int, left: bool) -> int:
+        """Insert the value into the list stored at key
+        """
+        k = self._k(pool, key)
+        data = pickle_dump(value)
+
+        try:
+            length = (self._client.lpush if left else self._client.rpush)(k, data)
+        except self._response_error:
+            if not self._is_empty_list(k):
+                raise self._type_error(pool, key)
+
+            # Marker can be replaced by another process meanwhile, so it is checked again within a transaction
+            try:
+                r = self._client.transaction(lambda pipe: self._push_to_empty_list(pipe, k, data, left), k)
+            except self._response_error:
+                raise self._type_error(pool, key)
+
+            return r[1] if len(r) > 1 else r[0]
+
+        if length == 1 and ttl:
+            self._client.expire(k, ttl)
+
+        return length
+
+    @staticmethod
+    def _push_to_empty_list(pipe, k: str, data: bytes, left: bool):
+        """Replace empty list marker with a list of one element, keeping key's TTL
+        """
+        ttl = pipe.pttl(k)
+        is_empty = pipe.type(k) == b'string' and pipe.get(k) == _REDIS_EMPTY_LIST
+
+        pipe.multi()
+        if is_empty:
+            pipe.delete(k)
+        (pipe.lpush if left else pipe.rpush)(k, data)
+        if is_empty and ttl > 0:
+            pipe.pexpire(k, ttl)
+
+    def list_l_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
+        """Insert the value at the head of the list stored at key
+        """
+        return self._list_push(pool, key, value, ttl, True)
+
+    def list_r_push(self, pool: str, key: str, value: Any, ttl: int = None) -> int:
+        """Insert the value at the tail of the list stored at key
+        """
+        return self._list_push(pool, key, value, ttl, False)
+
+    def _list_pop(self, pool: str, key: str, left: bool) -> Any:
+        """Remove and return an element of the list stored at key
+        """
+        k = self._k(pool, key)
+
+        try:
+            value = (self._client.lpop if left else self._client.rpop)(k)
+        except self._response_error:
+            if self._is_empty_list(k):
+                raise _error.KeyNotExist(pool, key)
+            raise self._type_error(pool, key)
+
+        if value is None:
+            raise _error.KeyNotExist(pool, key)
+
+        return pickle_load(value)
+
+    def list_l_pop(self, pool: str, key: str) -> Any:
+        """Remove and return the first element of the list stored at key
+        """
+        return self._list_pop(pool, key, True)
+
+    def list_r_pop(self, pool: str, key: str) -> Any:
+        """Remove and return the last element of the list stored at key
+        """
+        return self._list_pop(pool, key, False)
+
+    def expire(self, pool: str, key: str, ttl: int):
+        """Set a timeout on key
+        """
+        k = self._k(pool, key)
+        r = self._client.expire(k, ttl) if ttl else self._client.persist(k) or self._client.exists(k)
+
+        if not r:
+            raise _error.KeyNotExist(pool, key)
+
+    def ttl(self, pool: str, key: str) -> Optional[int]:
+        """Get remaining time to live of a key
+        """
+        r = self._client.ttl(self._k(pool, key))
+
+        if r == -2:
+            raise _error.KeyNotExist(pool, key)
+
+        return r if r >= 0 else None
+
+    def rnm(self, pool: str, key: str, new_key: str):
+        """Rename a key
+        """
+        try:
+            self._client.rename(self._k(pool, key), self._k(pool, new_key))
+        except self._response_error:
+            raise _error.KeyNotExist(pool, key)
+
+    def rm(self, pool: str, key: str):
+        """Remove a value from the pool
+        """
+        self._client.delete(self._k(pool, key))
+
+    def lock(self, pool: str, key: str, ttl: int) -> bool:
+        """Try to acquire an expiring lock named after the key without waiting
+        """
+        return bool(self._client.set(self._lock_k(pool, key), time(), ex=ttl, nx=True))
+
+    def unlock(self, pool: str, key: str):
+        """Release a lock acquired by lock()
+        """
+        self._client.delete(self._lock_k(pool, key))
+
+    def sweep(self, pool: str, limit: int) -> int:
+        """Remove at most limit expired items from the pool, returns number of processed items
+        """
+        # Redis expires keys by itself
+        return 0
+
+    def cleanup(self, pool: str):
+        """Cleanup outdated items from the pool
+        """
+        # Redis expires keys by itself
+        pass
+
+    def _rm_matching(self, pattern: str):
+        """Remove all keys matching a pattern
+        """
+        pipe = self._client.pipeline(False)
+        for i, k in enumerate(self._client.scan_iter(match=pattern, count=1000), 1):
+            pipe.delete(k)
+            if not i % 1000:
+                pipe.execute()
+        pipe.execute()
+
+    def rm_prefix(self, pool: str, prefix: str):
+        """Remove all values which keys start with a prefix
+        """
+        self._rm_matching(self._pool_pattern(pool, prefix))
+
+    def clear(self, pool: str):
+        """Clear entire pool
+        """
+        self._rm_matching(self._pool_pattern(pool))
@@ -0,0 +1,13 @@
+"""PytSite Cache Event Handlers
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+from . import _stats
+
+
+def stats_update() -> str:
+    """pytsite.stats@update
+    """
+    return _stats.format_stats()
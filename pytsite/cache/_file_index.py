@@ -0,0 +1,125 @@
+"""PytSite Cache File Driver Keys Index
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import sqlite3
+from typing import Callable, Iterable, List, Optional, Tuple, Type
+from os import path, makedirs, getpid
+from pickle import dumps as pickle_dump, loads as pickle_load
+from threading import local
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS keys ('
+    'key TEXT PRIMARY KEY, path TEXT NOT NULL, created REAL NOT NULL, expires REAL, type BLOB NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS keys_expires ON keys (expires) WHERE expires IS NOT NULL',
+)
+
+
+class FileIndex:
+    """Per Pool Keys Index of the File Driver
+
+    Keeps key's file path, creation and expiration time and value type in an SQLite database per pool, so metadata
+    queries and expiration cleanup do not need to walk directories and read items' files. Item files remain the source
+    of truth: the index is rebuilt from them if its database is missing.
+    """
+
+    def __init__(self, root_dir: str, rebuild: Callable[[str], Iterable[Tuple[str, str, float, float, Type]]]):
+        """Init
+        """
+        self._root_dir = root_dir
+        self._rebuild = rebuild
+        self._local = local()
+
+        if not path.exists(root_dir):
+            makedirs(root_dir, 0o755, True)
+
+    def _db(self, pool: str) -> sqlite3.Connection:
+        """Get database connection of the pool for current thread
+        """
+        # Connections must not be shared between threads or inherited by forked processes
+        if getattr(self._local, 'pid', None) != getpid():
+            self._local.pid = getpid()
+            self._local.connections = {}
+
+        db = self._local.connections.get(pool)
+        if db:
+            return db
+
+        db_path = path.join(self._root_dir, pool + '.sqlite')
+        is_new = not path.exists(db_path)
+
+        db = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        for sql in _SCHEMA:
+            db.execute(sql)
+
+        if is_new:
+            db.executemany('INSERT OR REPLACE INTO keys VALUES (?, ?, ?, ?, ?)',
+                           ((k, p, c, e, pickle_dump(t)) for k, p, c, e, t in self._rebuild(pool)))
+
+        self._local.connections[pool] = db
+
+        return db
+
+    def put(self, pool: str, key: str, f_path: str, created: float, expires: Optional[float], value_type: Type):
+        """Add or update a key
+        """
+        self._db(pool).execute('INSERT OR REPLACE INTO keys VALUES (?, ?, ?, ?, ?)',
+                               (key, f_path, created, expires, pickle_dump(value_type)))
+
+    def get(self, pool: str, key: str) -> Optional[Tuple[str, float, Optional[float], Type]]:
+        """Get key's file path, creation time, expiration time and value type
+        """
+        row = self._db(pool).execute('SELECT path, created, expires, type FROM keys WHERE key = ?', (key,)).fetchone()
+
+        return (row[0], row[1], row[2], pickle_load(row[3])) if row else None
+
+    def rm(self, pool: str, key: str):
+        """Remove a key
+        """
+        self._db(pool).execute('DELETE FROM keys WHERE key = ?', (key,))
+
+    def clear(self, pool: str):
+        """Remove all keys
+        """
+        self._db(pool).execute('DELETE FROM keys')
+
+    def keys(self, pool: str, prefix: str = None, now: float = None) -> List[str]:
+        """Get keys, optionally only those starting with a prefix and only those which are not expired at given time
+        """
+        conditions, args = [], []
+
+        if prefix:
+            # Range condition allows to use primary key's index
+            last = ord(prefix[-1]) + 1
+            if 0xd800 <= last < 0xe000:
+                last = 0xe000
+            if last <= 0x10ffff:
+                conditions.append('key >= ? AND key < ?')
+                args.extend((prefix, prefix[:-1] + chr(last)))
+            else:
+                conditions.append('substr(key, 1, ?) = ?')
+                args.extend((len(prefix), prefix))
+
+        if now is not None:
+            conditions.append('(expires IS NULL OR expires > ?)')
+            args.append(now)
+
+        sql = 'SELECT key FROM keys' + (' WHERE ' + ' AND '.join(conditions) if conditions else '')
+
+        return [r[0] for r in self._db(pool).execute(sql, args)]
+
+    def of_type(self, pool: str, value_type: Type) -> List[str]:
+        """Get keys of particular value type
+        """
+        return [r[0] for r in self._db(pool).execute('SELECT key FROM keys WHERE type = ?', (pickle_dump(value_type),))]
+
+    def expired(self, pool: str, now: float, limit: int = -1) -> List[Tuple[str, str]]:
+        """Get keys and file paths of items which expired before given time
+        """
+        return self._db(pool).execute('SELECT key, path FROM keys WHERE expires <= ? ORDER BY expires LIMIT ?',
+                                      (now, limit)).fetchall()
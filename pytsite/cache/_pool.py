@@ -5,8 +5,48 @@ __author__ = 'Oleksandr Shepetko'
 __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
-from typing import Mapping, List, Callable, Generator, Type, Any
-from ._driver import Abstract as AbstractDriver
+from typing import Mapping, List, Callable, Generator, Type, Any, Iterable, Dict, Tuple, Optional
+from threading import Lock
+from time import time, sleep, perf_counter
+from pytsite import reg
+from ._driver import Abstract as AbstractDriver, MISSING
+from . import _error, _stats
+
+_LOOKUP_OPS = {'get', 'get_hash', 'get_hash_item', 'get_list'}
+_PUT_OPS = {'put', 'put_hash', 'put_hash_item', 'put_list', 'list_l_push', 'list_r_push'}
+
+# In-process computations in progress, (pool, key) -> [lock, number of waiters]
+_flights = {}  # type: Dict[Tuple[str, str], list]
+_flights_lock = Lock()
+
+
+def _flight_acquire(f_key: Tuple[str, str], blocking: bool = True) -> Optional[list]:
+    """Join an in-process computation of a key
+    """
+    with _flights_lock:
+        flight = _flights.setdefault(f_key, [Lock(), 0])
+        flight[1] += 1
+
+    if flight[0].acquire(blocking):
+        return flight
+
+    _flight_leave(f_key, flight)
+
+
+def _flight_release(f_key: Tuple[str, str], flight: list):
+    """Finish an in-process computation of a key
+    """
+    flight[0].release()
+    _flight_leave(f_key, flight)
+
+
+def _flight_leave(f_key: Tuple[str, str], flight: list):
+    """Leave an in-process computation of a key
+    """
+    with _flights_lock:
+        flight[1] -= 1
+        if not flight[1]:
+            del _flights[f_key]
 
 
 class Pool:
@@ -22,112 +62,278 @@ class Pool:
         """
         return self._uid
 
+    def _call(self, op: str, *args) -> Any:
+        """Call a driver's method, collecting statistics
+        """
+        method = getattr(self._get_driver(), op)
+        if not _stats.is_enabled():
+            return method(self._uid, *args)
+
+        start = perf_counter()
+        try:
+            r = method(self._uid, *args)
+        except _error.KeyNotExist:
+            if op in _LOOKUP_OPS:
+                _stats.count(self._uid, 'misses')
+            raise
+        finally:
+            _stats.observe(self._uid, op, perf_counter() - start)
+
+        if op in _LOOKUP_OPS:
+            _stats.count(self._uid, 'hits')
+        elif op in _PUT_OPS:
+            _stats.count(self._uid, 'puts')
+
+        return r
+
     def keys(self) -> Generator[str, None, None]:
         """Get all existing keys in current pool
         """
         return self._get_driver().keys(self._uid)
 
+    def scan(self, prefix: str) -> Generator[str, None, None]:
+        """Get keys of the pool which start with a prefix
+        """
+        return self._get_driver().scan(self._uid, prefix)
+
     def has(self, key: str) -> bool:
         """Check whether an item exists in the pool
         """
-        return self._get_driver().has(self._uid, key)
+        return self._call('has', key)
 
     def type(self, key: str) -> Type:
         """Get key's value type
         """
-        return self._get_driver().type(self._uid, key)
+        return self._call('type', key)
 
     def put(self, key: str, value, ttl: int = None):
         """Put an item into the pool
         """
-        return self._get_driver().put(self._uid, key, value, ttl)
+        return self._call('put', key, value, ttl)
 
     def get(self, key: str):
         """Get an item from the pool
         """
-        return self._get_driver().get(self._uid, key)
+        return self._call('get', key)
+
+    def get_or_compute(self, key: str, fn: Callable[[], Any], ttl: int = None, stale_ttl: int = 0,
+                       lock_timeout: int = None) -> Any:
+        """Get an item from the pool or compute and store it, letting only one caller compute at a time
+
+        Concurrent callers, including other processes and hosts sharing the driver, wait for the one that computes
+        the value. If stale_ttl is set, value is kept stale_ttl seconds longer than ttl and during this time it is
+        returned to all callers but one, which recomputes it. Dicts and lists are stored as hashes and lists.
+        """
+        driver = self._get_driver()
+        f_key = (self._uid, key)
+        ttl = ttl or None
+        stale_ttl = stale_ttl if ttl else 0
+        if lock_timeout is None:
+            lock_timeout = reg.get('cache.compute_lock_timeout', 30)
+
+        try:
+            value = self._read(driver, key)
+            _stats.count(self._uid, 'hits')
+
+            # Values stored without expiration time never become stale
+            remaining = driver.ttl(self._uid, key) if stale_ttl else None
+            if remaining is None or remaining >= stale_ttl:
+                return value
+
+            # Stale value, recompute it only if nobody else does it right now
+            flight = _flight_acquire(f_key, False)
+            if not flight:
+                return value
+            try:
+                if not driver.lock(self._uid, key, lock_timeout):
+                    return value
+                try:
+                    return self._compute(driver, key, fn, ttl, stale_ttl)
+                finally:
+                    driver.unlock(self._uid, key)
+            finally:
+                _flight_release(f_key, flight)
+
+        except _error.KeyNotExist:
+            _stats.count(self._uid, 'misses')
+
+        flight = _flight_acquire(f_key)
+        try:
+            deadline = time() + lock_timeout
+            while True:
+                try:
+                    return self._read(driver, key)
+                except _error.KeyNotExist:
+                    pass
+
+                if driver.lock(self._uid, key, lock_timeout):
+                    try:
+                        return self._compute(driver, key, fn, ttl, stale_ttl)
+                    finally:
+                        driver.unlock(self._uid, key)
+
+                # Holder of the lock has failed to compute the value in time
+                if time() >= deadline:
+                    return self._compute(driver, key, fn, ttl, stale_ttl)
+
+                sleep(0.05)
+        finally:
+            _flight_release(f_key, flight)
+
+    def _read(self, driver: AbstractDriver, key: str) -> Any:
+        """Get a value of any type
+        """
+        try:
+            return driver.get(self._uid, key)
+        except _error.ValueTypeError:
+            value_type = driver.type(self._uid, key)
+            if issubclass(value_type, dict):
+                return driver.get_hash(self._uid, key)
+            elif issubclass(value_type, list):
+                return driver.get_list(self._uid, key)
+            raise
+
+    def _compute(self, driver: AbstractDriver, key: str, fn: Callable[[], Any], ttl: Optional[int],
+                 stale_ttl: int) -> Any:
+        """Compute and store a value
+        """
+        value = fn()
+        _stats.count(self._uid, 'puts')
+        ttl = ttl + stale_ttl if ttl else None
+
+        if isinstance(value, dict):
+            driver.put_hash(self._uid, key, value, ttl)
+        elif isinstance(value, list):
+            driver.put_list(self._uid, key, value, ttl)
+        else:
+            driver.put(self._uid, key, value, ttl)
+
+        return value
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several items from the pool, MISSING is returned for not existing keys
+        """
+        keys = list(keys)
+        r = self._call('get_many', keys)
+        misses = sum(1 for v in r.values() if v is MISSING)
+        _stats.count(self._uid, 'hits', len(r) - misses)
+        _stats.count(self._uid, 'misses', misses)
+
+        return r
+
+    def put_many(self, items: Mapping[str, Any], ttl: int = None):
+        """Put several items into the pool
+        """
+        _stats.count(self._uid, 'puts', len(items))
+
+        return self._call('put_many', items, ttl)
+
+    def has_many(self, keys: Iterable[str]) -> Dict[str, bool]:
+        """Check whether the pool contains several keys
+        """
+        return self._call('has_many', keys)
+
+    def rm_many(self, keys: Iterable[str]):
+        """Remove several values from the pool
+        """
+        return self._call('rm_many', keys)
 
     def put_hash(self, key: str, value: Mapping, ttl: int = None):
         """Put a hash item into the pool
         """
-        return self._get_driver().put_hash(self._uid, key, value, ttl)
+        return self._call('put_hash', key, value, ttl)
 
     def put_hash_item(self, key: str, item_key: str, value):
         """Put a value into a hash
         """
-        return self._get_driver().put_hash_item(self._uid, key, item_key, value)
+        return self._call('put_hash_item', key, item_key, value)
 
     def get_hash(self, key: str, hash_keys: List[str] = None) -> Mapping:
         """Get hash
         """
-        return self._get_driver().get_hash(self._uid, key, hash_keys)
+        return self._call('get_hash', key, hash_keys)
 
     def get_hash_item(self, key: str, item_key: str, default=None):
         """Get a value from a hash
         """
-        return self._get_driver().get_hash_item(self._uid, key, item_key, default)
+        return self._call('get_hash_item', key, item_key, default)
 
     def rm_hash_item(self, key: str, item_key: str):
         """Remove a value from a hash
         """
-        return self._get_driver().rm_hash_item(self._uid, key, item_key)
+        return self._call('rm_hash_item', key, item_key)
 
     def list_len(self, key: str):
         """Return the length of the list stored at key
         """
-        return self._get_driver().list_len(self._uid, key)
+        return self._call('list_len', key)
 
     def get_list(self, key: str, start: int = 0, stop: int = None) -> list:
         """Return the specified elements of the list stored at key
         """
-        return self._get_driver().get_list(self._uid, key, start, stop)
+        return self._call('get_list', key, start, stop)
 
     def put_list(self, key: str, value: list, ttl: int = None) -> list:
         """Store a list
         """
-        return self._get_driver().put_list(self._uid, key, value, ttl)
+        return self._call('put_list', key, value, ttl)
 
     def list_l_push(self, key: str, value: Any, ttl: int = None) -> int:
         """Insert the value at the head of the list stored at key
         """
-        return self._get_driver().list_l_push(self._uid, key, value, ttl)
+        return self._call('list_l_push', key, value, ttl)
 
     def list_r_push(self, key: str, value: Any, ttl: int = None) -> int:
         """Insert the value at the tail of the list stored at key
         """
-        return self._get_driver().list_r_push(self._uid, key, value, ttl)
+        return self._call('list_r_push', key, value, ttl)
 
     def list_l_pop(self, key: str):
         """Remove and return the first element of the list stored at key
         """
-        return self._get_driver().list_l_pop(self._uid, key)
+        return self._call('list_l_pop', key)
 
     def list_r_pop(self, key: str):
         """Remove and return the last element of the list stored at key
         """
-        return self._get_driver().list_r_pop(self._uid, key)
+        return self._call('list_r_pop', key)
 
     def ttl(self, key: str) -> int:
         """Get remaining time to live of a key
         """
-        return self._get_driver().ttl(self._uid, key)
+        return self._call('ttl', key)
+
+    def expire(self, key: str, ttl: int):
+        """Set a timeout on key
+        """
+        return self._call('expire', key, ttl)
 
     def rnm(self, key: str, new_key: str):
         """Rename a key
         """
-        return self._get_driver().rnm(self._uid, key, new_key)
+        return self._call('rnm', key, new_key)
 
     def rm(self, key: str):
         """Remove a value from the pool
         """
-        return self._get_driver().rm(self._uid, key)
+        return self._call('rm', key)
+
+    def rm_prefix(self, prefix: str):
+        """Remove all values which keys start with a prefix
+        """
+        return self._call('rm_prefix', prefix)
 
     def clear(self):
         """Clear entire pool
         """
-        return self._get_driver().clear(self._uid)
+        return self._call('clear')
+
+    def sweep(self, limit: int) -> int:
+        """Remove at most limit expired items from the pool, returns number of processed items
+        """
+        return self._call('sweep', limit)
 
     def cleanup(self):
         """Cleanup outdated items from the pool
         """
-        return self._get_driver().cleanup(self._uid)
+        return self._call('cleanup')
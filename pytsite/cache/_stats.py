@@ -0,0 +1,202 @@
+"""PytSite Cache Statistics
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import json
+from typing import Dict, Optional
+from bisect import bisect_left
+from threading import Lock
+from os import path, makedirs, listdir, getpid, replace, unlink
+from tempfile import mkstemp
+from time import time
+from pytsite import reg
+
+COUNTERS = ('hits', 'misses', 'puts', 'evictions', 'expirations', 'bytes_read', 'bytes_written')
+
+# Upper bounds of latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+_enabled = reg.get('cache.stats', True)
+_stats = {}  # type: Dict[str, _PoolStats]
+_lock = Lock()
+
+
+class _PoolStats:
+    """Statistics of a Single Pool
+    """
+    __slots__ = ('counters', 'latency')
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.latency = {}  # type: Dict[str, list]
+
+
+def _get(pool: str) -> _PoolStats:
+    """Get statistics of a pool, creating it if necessary
+    """
+    stats = _stats.get(pool)
+    if not stats:
+        stats = _stats[pool] = _PoolStats()
+
+    return stats
+
+
+def is_enabled() -> bool:
+    """Check whether statistics collection is enabled
+    """
+    return _enabled
+
+
+def count(pool: str, counter: str, n: int = 1):
+    """Increment a counter of a pool
+    """
+    if not _enabled or not n:
+        return
+
+    with _lock:
+        _get(pool).counters[counter] += n
+
+
+def observe(pool: str, op: str, seconds: float):
+    """Record duration of a driver operation
+    """
+    if not _enabled:
+        return
+
+    ms = seconds * 1000
+    with _lock:
+        hist = _get(pool).latency.get(op)
+        if not hist:
+            # Buckets counts, overflow bucket count, total time
+            hist = _get(pool).latency[op] = [0] * (len(LATENCY_BUCKETS) + 2)
+        hist[bisect_left(LATENCY_BUCKETS, ms)] += 1
+        hist[-1] += ms
+
+
+def _dumps_dir() -> str:
+    """Get path of the directory where processes dump their statistics
+    """
+    return reg.get('cache.stats_path', path.join(reg.get('paths.storage'), 'cache_stats'))
+
+
+def dump():
+    """Save statistics of current process, so it can be read by other processes
+    """
+    with _lock:
+        data = {p_uid: [stats.counters, stats.latency] for p_uid, stats in _stats.items()}
+        data = json.dumps(data)
+
+    d_path = _dumps_dir()
+    makedirs(d_path, 0o755, True)
+    fd, tmp_path = mkstemp(dir=d_path, suffix='.tmp')
+    with open(fd, 'wt') as f:
+        f.write(data)
+    replace(tmp_path, path.join(d_path, '{}.json'.format(getpid())))
+
+
+def _collect(max_age: int) -> Dict[str, _PoolStats]:
+    """Merge statistics of current process with statistics recently dumped by other ones
+    """
+    with _lock:
+        r = {}
+        for p_uid, stats in _stats.items():
+            r[p_uid] = _PoolStats()
+            r[p_uid].counters.update(stats.counters)
+            r[p_uid].latency = {op: list(hist) for op, hist in stats.latency.items()}
+
+    d_path = _dumps_dir()
+    if not path.isdir(d_path):
+        return r
+
+    own_name = '{}.json'.format(getpid())
+    for f_name in listdir(d_path):
+        if not f_name.endswith('.json') or f_name == own_name:
+            continue
+
+        f_path = path.join(d_path, f_name)
+        try:
+            # Dumps of finished processes are not updated anymore
+            if path.getmtime(f_path) < time() - max_age:
+                unlink(f_path)
+                continue
+
+            with open(f_path, 'rt') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        for p_uid, (counters, latency) in data.items():
+            stats = r.setdefault(p_uid, _PoolStats())
+            for counter, n in counters.items():
+                stats.counters[counter] = stats.counters.get(counter, 0) + n
+            for op, hist in latency.items():
+                if op in stats.latency:
+                    stats.latency[op] = [a + b for a, b in zip(stats.latency[op], hist)]
+                else:
+                    stats.latency[op] = hist
+
+    return r
+
+
+def get_stats(pool: str = None, all_processes: bool = False) -> Dict[str, dict]:
+    """Get statistics of all pools or of a particular one
+
+    Statistics are collected per process since the process start or last reset. If all_processes is True, statistics
+    recently dumped by other processes are summed up with current process's ones.
+    """
+    if all_processes:
+        all_stats = _collect(reg.get('cache.stats_dump_max_age', 180))
+    else:
+        with _lock:
+            all_stats = dict(_stats)
+
+    with _lock:
+        items = [(pool, all_stats[pool])] if pool in all_stats else ([] if pool else list(all_stats.items()))
+        r = {}
+        for p_uid, stats in items:
+            p_stats = dict(stats.counters)
+            lookups = p_stats['hits'] + p_stats['misses']
+            p_stats['hit_ratio'] = p_stats['hits'] / lookups if lookups else None
+            p_stats['latency'] = {}
+            for op, hist in stats.latency.items():
+                op_count = sum(hist[:-1])
+                p_stats['latency'][op] = {
+                    'count': op_count,
+                    'avg_ms': hist[-1] / op_count,
+                    'buckets': dict(zip(LATENCY_BUCKETS + (None,), hist[:-1])),
+                }
+            r[p_uid] = p_stats
+
+    return r
+
+
+def reset_stats(pool: str = None):
+    """Reset statistics of all pools or of a particular one
+    """
+    with _lock:
+        if pool:
+            _stats.pop(pool, None)
+        else:
+            _stats.clear()
+
+
+def format_stats(pool: str = None, all_processes: bool = False) -> Optional[str]:
+    """Get human readable statistics summary
+    """
+    lines = []
+    for p_uid, p_stats in sorted(get_stats(pool, all_processes).items()):
+        ratio = p_stats['hit_ratio']
+        line = "cache pool '{}': hits {}, misses {}, hit ratio {}, puts {}, evictions {}, expirations {}, " \
+               "read {} B, written {} B".format(p_uid, p_stats['hits'], p_stats['misses'],
+                                                '{:.1%}'.format(ratio) if ratio is not None else '-',
+                                                p_stats['puts'], p_stats['evictions'], p_stats['expirations'],
+                                                p_stats['bytes_read'], p_stats['bytes_written'])
+        ops = ', '.join('{} {:.2f} ms'.format(op, l_stats['avg_ms']) for op, l_stats in
+                        sorted(p_stats['latency'].items()))
+        if ops:
+            line += '; avg latency: ' + ops
+        lines.append(line)
+
+    return '\n'.join(lines) or None
@@ -127,7 +127,7 @@ def run():
 
 
 def _print(msg: Union[str, Exception], color: str = None):
-    if reg.get('env.type') != 'wsgi':
+    if reg.get('env.type') not in ('wsgi', 'asgi'):
         print('{}{}{}'.format(color, msg, COLOR_END)) if color else print(msg)
 
 
@@ -15,7 +15,7 @@ def _init():
     lang.register_package(__name__)
     console.register_command(_console.Run())
 
-    if reg.get('env.type') == 'wsgi' and reg.get('cron.enabled', True):
+    if reg.get('env.type') in ('wsgi', 'asgi') and reg.get('cron.enabled', True):
         threading.run_in_thread(_worker.worker, 60)
 
 
@@ -5,33 +5,74 @@ __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
 import re as _re
-from typing import List, Tuple, Callable, Any, Pattern
+from typing import List, Tuple, Callable, Any, Pattern, Dict
+from bisect import bisect_right as _bisect_right
+from threading import Lock as _Lock
 
-_LISTENERS = []
+# Listeners sorted by priority, (handler, priority, regex)
+_LISTENERS = []  # type: List[Tuple[Callable[..., Any], int, Pattern]]
+_PRIORITIES = []  # type: List[int]
+
+# Listeners of exact event names and listeners which use wildcards, (order, handler, priority, regex)
+_EXACT = {}  # type: Dict[str, List[Tuple[int, Callable[..., Any], int, Pattern]]]
+_WILDCARD = []  # type: List[Tuple[int, Callable[..., Any], int, Pattern]]
+
+# Listeners of particular event names, rebuilt after a listener is added
+_TABLES = {}  # type: Dict[str, Tuple[Tuple[Callable[..., Any], int, Pattern], ...]]
+_TABLES_MAX_SIZE = 4096
+
+_WILDCARD_RE = _re.compile('[*?+^$|()\\[\\]{}\\\\]')
+
+_lock = _Lock()
 
 
 def listen(event_name: str, handler: callable, priority: int = 0):
     """Add an event listener.
     """
-    global _LISTENERS
-
     re = _re.compile(event_name.replace('.', '\\.').replace('*', '.*?') + '$')
-    _LISTENERS.append((handler, priority, re))
-    _LISTENERS = sorted(_LISTENERS, key=lambda x: x[1])  # Sort by priority
 
+    with _lock:
+        # Listeners with the same priority are called in order they were added
+        i = _bisect_right(_PRIORITIES, priority)
+        _PRIORITIES.insert(i, priority)
+        _LISTENERS.insert(i, (handler, priority, re))
 
-def listeners(event_name: str) -> List[Tuple[Callable[..., Any], int, Pattern]]:
+        # Names without regular expression special characters can be looked up in a dict
+        item = (len(_PRIORITIES), handler, priority, re)
+        if _WILDCARD_RE.search(event_name):
+            _WILDCARD.append(item)
+        else:
+            _EXACT.setdefault(event_name, []).append(item)
+
+        _TABLES.clear()
+
+
+def _table(event_name: str) -> Tuple[Tuple[Callable[..., Any], int, Pattern], ...]:
     """Get listeners of the event
     """
-    r = []
+    try:
+        return _TABLES[event_name]
+    except KeyError:
+        pass
 
-    for handler, priority, re in _LISTENERS:
-        if re.match(event_name):
-            r.append((handler, priority, re))
+    with _lock:
+        items = _EXACT.get(event_name, []) + [item for item in _WILDCARD if item[3].match(event_name)]
+        items.sort(key=lambda x: (x[2], x[0]))  # Sort by priority, then by order of adding
+        r = tuple((handler, priority, re) for order, handler, priority, re in items)
+
+        if len(_TABLES) >= _TABLES_MAX_SIZE:
+            _TABLES.clear()
+        _TABLES[event_name] = r
 
     return r
 
 
+def listeners(event_name: str) -> List[Tuple[Callable[..., Any], int, Pattern]]:
+    """Get listeners of the event
+    """
+    return list(_table(event_name))
+
+
 def fire(event_name: str, _concurrent: bool = False, _wait: bool = True, _stop_after: int = None, **kwargs) -> list:
     """Fires an event to listeners
     """
@@ -43,7 +84,7 @@ def fire(event_name: str, _concurrent: bool = False, _wait: bool = True, _stop_a
         q = queue.Queue('pytsite.events')
 
     count = 0
-    for handler, priority, re in listeners(event_name):
+    for handler, priority, re in _table(event_name):
         if _concurrent:
             # Queue handler
             q.put(handler, **kwargs)
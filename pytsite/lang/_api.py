@@ -15,7 +15,6 @@ from pytsite import threading, events
 from . import _error
 
 _languages = []
-_current = {}  # Thread safe current language
 _default = None  # type: str
 _packages = {}
 _globals = {}
@@ -97,7 +96,7 @@ def langs(include_current: bool = True) -> List[str]:
     r = _languages.copy()
 
     if not include_current:
-        r.remove(_current[threading.get_id()])
+        r.remove(get_current())
 
     return r
 
@@ -108,7 +107,7 @@ def set_current(language: str):
     if language not in _languages:
         raise _error.LanguageNotSupported("Language '{}' is not supported".format(language))
 
-    _current[threading.get_id()] = language
+    threading.get_context()['pytsite.lang.current'] = language
 
 
 def set_fallback(language: str):
@@ -127,11 +126,7 @@ def get_current() -> str:
     if not _languages:
         raise RuntimeError('No languages are defined')
 
-    tid = threading.get_id()
-    if tid not in _current:
-        _current[threading.get_id()] = _languages[0]
-
-    return _current[threading.get_id()]
+    return threading.get_context().setdefault('pytsite.lang.current', _languages[0])
 
 
 def get_primary() -> str:
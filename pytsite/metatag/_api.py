@@ -6,14 +6,21 @@ __license__ = 'MIT'
 
 from pytsite import lang, util, events, threading, package_info
 
-_tags = {}
+
+def _tags() -> dict:
+    """Get tags of current request
+    """
+    tags = threading.get_context().get('pytsite.metatag.tags')
+    if tags is None:
+        raise RuntimeError('reset() should be called before')
+
+    return tags
 
 
 def reset(title: str = None):
     """Reset tags
     """
-    tid = threading.get_id()
-    _tags[tid] = {}
+    threading.get_context()['pytsite.metatag.tags'] = {}
 
     t_set('charset', 'UTF-8')
     t_set('title', title or lang.t('pytsite.metatag@untitled_document'))
@@ -24,85 +31,76 @@ def reset(title: str = None):
 def t_set(tag: str, value: str = None, **kwargs):
     """Set tag's value
     """
-    if not _tags:
-        raise RuntimeError('reset() should be called before')
-
-    tid = threading.get_id()
+    tags = _tags()
 
-    if tag not in _tags[tid]:
-        _tags[tid][tag] = [] if tag == 'link' else ''
+    if tag not in tags:
+        tags[tag] = [] if tag == 'link' else ''
 
     if tag == 'link':
-        _tags[tid][tag].append(kwargs)
+        tags[tag].append(kwargs)
     else:
-        _tags[tid][tag] = util.escape_html(value)
+        tags[tag] = util.escape_html(value)
 
 
 def get(tag: str) -> str:
     """Get value of the tag
     """
-    if not _tags:
-        raise RuntimeError('reset() should be called before')
-
-    return _tags[threading.get_id()].get(tag, '')
+    return _tags().get(tag, '')
 
 
 def rm(tag: str, **kwargs):
     """Remove a tag
     """
-    tid = threading.get_id()
-    if tid not in _tags or tag not in _tags[tid]:
+    tags = threading.get_context().get('pytsite.metatag.tags')
+    if tags is None or tag not in tags:
         return
 
     if tag == 'link':
-        if not _tags[tid][tag]:
+        if not tags[tag]:
             return
 
         values_to_rm = []
-        for v in _tags[tid][tag]:
+        for v in tags[tag]:
             if set(kwargs.items()).issubset(set(v.items())):
                 values_to_rm.append(v)
 
         for v in values_to_rm:
-            _tags[tid][tag].remove(v)
+            tags[tag].remove(v)
 
     else:
-        del _tags[tid][tag]
+        del tags[tag]
 
 
 def dump(tag: str) -> str:
     """Dump a tag
     """
-    if not _tags:
-        raise RuntimeError('reset() should be called before')
+    tags = _tags()
 
-    tid = threading.get_id()
-
-    if tag not in _tags[tid]:
+    if tag not in tags:
         return ''
 
     # Page charset
     if tag == 'charset':
-        r = '<meta charset="{}">\n'.format(_tags[tid][tag])
+        r = '<meta charset="{}">\n'.format(tags[tag])
 
     # Page title
     elif tag == 'title':
-        r = '<title>{} | {}</title>\n'.format(_tags[tid][tag], lang.t('app_name'))
+        r = '<title>{} | {}</title>\n'.format(tags[tag], lang.t('app_name'))
 
     # OpenGraph tags
     elif tag.startswith('og:') or tag.startswith('author:') or tag.startswith('fb:'):
-        r = '<meta property="{}" content="{}">'.format(tag, _tags[tid][tag])
+        r = '<meta property="{}" content="{}">'.format(tag, tags[tag])
 
     # Page links
     elif tag == 'link':
         r = ''
-        for value in _tags[tid][tag]:
+        for value in tags[tag]:
             args_str = ' '.join(['{}="{}"'.format(k, v) for k, v in value.items()])
             r += '<{} {}>\n'.format(tag, args_str)
 
     # Other
     else:
-        r = '<meta name="{}" content="{}">'.format(tag, _tags[tid][tag])
+        r = '<meta name="{}" content="{}">'.format(tag, tags[tag])
 
     return r
 
@@ -110,13 +108,12 @@ def dump(tag: str) -> str:
 def dump_all() -> str:
     """Dump all tags
     """
-    if not _tags:
-        raise RuntimeError('reset() should be called before')
+    tags = _tags()
 
     events.fire('pytsite.metatag@dump_all')
 
     r = str()
-    for tag in _tags[threading.get_id()]:
+    for tag in tags:
         r += dump(tag) + '\n'
 
     return r
@@ -39,6 +39,7 @@ _plugman_cache = cache.create_pool('pytsite.plugman')
 _PLUGINS_DIR_PATH = path.join(reg.get('paths.root'), 'plugins')
 _PLUGINS_PACKAGE_NAME = 'plugins'
 _CACHE_TTL = 900  # 15 min
+_CACHE_STALE_TTL = 300  # 5 min
 
 reg.put('paths.plugins', _PLUGINS_DIR_PATH)
 
@@ -122,10 +123,9 @@ def remote_plugins_info(use_cache: bool = True) -> Dict[str, dict]:
     if not use_cache:
         _plugman_cache.clear()
 
-    try:
-        data = _plugman_cache.get_hash('remote_plugins')
-    except cache.error.KeyNotExist:
-        data = _plugman_cache.put_hash('remote_plugins', _plugins_api_request('plugins'), _CACHE_TTL)
+    # Only one process requests the API when the cached data is missing or outdated
+    data = _plugman_cache.get_or_compute('remote_plugins_info', lambda: _plugins_api_request('plugins'),
+                                         _CACHE_TTL, _CACHE_STALE_TTL)
 
     # Sanitize data structures
     n_data = {}
@@ -257,8 +257,10 @@ def load(plugin_name: str, v_range: VersionRange = None, _required_by: str = Non
         if hasattr(plugin, 'plugin_load'):
             plugin.plugin_load()
 
-        # plugin_load_{env.type}() hook
+        # plugin_load_{env.type}() hook, ASGI environment falls back to WSGI one's hook
         hook_name = 'plugin_load_{}'.format(reg.get('env.type'))
+        if reg.get('env.type') == 'asgi' and not hasattr(plugin, hook_name):
+            hook_name = 'plugin_load_wsgi'
         if hasattr(plugin, hook_name):
             getattr(plugin, hook_name)()
 
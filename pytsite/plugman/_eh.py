@@ -22,7 +22,7 @@ def on_pytsite_load():
         return
 
     # If there waiting updates exist, reload the application
-    if reg.get('env.type') == 'wsgi':
+    if reg.get('env.type') in ('wsgi', 'asgi'):
         logger.warn('Application needs to be loaded in console to finish plugins update')
         return
 
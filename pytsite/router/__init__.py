@@ -4,15 +4,17 @@ __author__ = 'Oleksandr Shepetko'
 __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
+from ._session_store import CacheSessionStore
 from ._api import handle, add_path_alias, base_path, base_url, call, current_path, current_url, dispatch, rule_path, \
     rule_url, is_base_url, has_rule, no_cache, no_store, private, max_age, remove_path_alias, scheme, server_name, \
-    url, session, request, set_request, get_session_store, on_pre_dispatch, on_dispatch, on_response, on_exception, \
-    on_xhr_dispatch, on_xhr_pre_dispatch, on_xhr_response, delete_session, is_main_host
+    url, session, request, set_request, get_session_store, set_session_store, on_pre_dispatch, on_dispatch, \
+    on_response, on_exception, on_xhr_dispatch, on_xhr_pre_dispatch, on_xhr_response, delete_session, is_main_host, \
+    match_cache_stats, page_cache_invalidate, on_page_cache_invalidate, dispatch_async, is_async
 
 
 def _init():
     from os import path, makedirs
-    from pytsite import tpl, lang, reg, cleanup
+    from pytsite import tpl, lang, reg, cleanup, events, on_pytsite_load
     from . import _eh
 
     # Resources
@@ -21,7 +23,7 @@ def _init():
 
     # Create directory to store session data
     session_storage_path = reg.get('paths.session')
-    if not path.exists(session_storage_path):
+    if reg.get('router.session_store', 'file') == 'file' and not path.exists(session_storage_path):
         makedirs(session_storage_path, 0o755, True)
 
     # Lang globals
@@ -38,13 +40,11 @@ def _init():
     tpl.register_global('is_main_host', is_main_host)
     tpl.register_global('session_messages', lambda x: session().get_messages(x) if session() else ())
 
-    # Clear flash messages from all sessions
-    s_store = get_session_store()
-    for sid in s_store.list():
-        s_store.save_if_modified(s_store.get(sid).clear_messages())
-
     # Events handlers
+    on_pytsite_load(_eh.on_pytsite_load)
     cleanup.on_cleanup(_eh.on_cleanup)
+    events.listen('pytsite.update@update', _eh.on_update)
+    events.listen('pytsite.reload@reload', _eh.on_reload)
 
 
 _init()
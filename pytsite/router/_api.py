@@ -5,67 +5,99 @@ __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
 import re as _re
-from typing import Dict, Union, List, Mapping, Optional, Type, Tuple
+import asyncio
+import contextvars
+from typing import Union, List, Mapping, Optional, Type, Tuple, Iterator, Coroutine, Generator, Any
+from concurrent.futures import Executor
+from inspect import iscoroutine, iscoroutinefunction
+from functools import lru_cache
+from datetime import datetime
+from time import time
 from traceback import format_exc
 from urllib import parse as urlparse
-from werkzeug.contrib.sessions import FilesystemSessionStore
+from werkzeug.contrib.sessions import SessionStore, FilesystemSessionStore
+from werkzeug.wsgi import ClosingIterator
 from xxhash import xxh32_hexdigest
-from pytsite import reg, logger, http, util, lang as lang_api, tpl, threading, events, routing, maintenance, errors
+from pytsite import reg, logger, http, util, lang as lang_api, tpl, threading, events, routing, maintenance, errors, \
+    cache
+from ._session_store import CacheSessionStore
 
 _LANG_CODE_RE = _re.compile('^/[a-z]{2}(/|$)')
 
 # Rules map
-_rules = routing.RulesMap()
+_rules = routing.RulesMap(reg.get('router.match_cache_size', 1024))
 
 # Path aliases
 _path_aliases = {}
 
-# Session store
-_session_store = FilesystemSessionStore(path=reg.get('paths.session'), session_class=http.Session)
-
-# Thread safe requests collection
-_requests = {}  # type: Dict[int, http.Request]
+# Full-page responses cache
+_page_cache = cache.create_pool('pytsite.router.page_cache')
 
-# Thread safe sessions collection
-_sessions = {}  # type: Dict[int, http.Session]
 
-# Per thread 'no-cache' cache control directives
-_cache_control_no_cache = {}  # type: Dict[int, bool]
+def _create_session_store() -> SessionStore:
+    """Create session store according to configuration
+    """
+    store_type = reg.get('router.session_store', 'file')
+    ttl = reg.get('router.session_ttl', 86400)
 
-# Per thread 'no-store' cache control directives
-_cache_control_no_store = {}  # type: Dict[int, bool]
+    if store_type == 'cache':
+        return CacheSessionStore(cache.create_pool('pytsite.router.session'), ttl,
+                                 reg.get('router.session_touch_interval', 60))
+    elif store_type == 'file':
+        return FilesystemSessionStore(path=reg.get('paths.session'), session_class=http.Session)
+    else:
+        raise ValueError("Unsupported session store type: '{}'".format(store_type))
 
-# Per thread 'private' cache control directives
-_cache_control_private = {}  # type: Dict[int, bool]
 
-# Per thread 'max-age' cache control directives
-_cache_control_max_age = {}  # type: Dict[int, int]
+# Session store
+_session_store = _create_session_store()
 
 
-def get_session_store() -> FilesystemSessionStore:
+def get_session_store() -> SessionStore:
     """Get session store
     """
     return _session_store
 
 
+def set_session_store(store: SessionStore):
+    """Set session store
+    """
+    global _session_store
+
+    _session_store = store
+
+
 def set_request(r: http.Request):
-    """Set request for current thread
+    """Set request for current context
     """
-    _requests[threading.get_id()] = r
+    threading.get_context()['pytsite.router.request'] = r
 
     return r
 
 
 def request() -> Optional[http.Request]:
-    """Get request of current thread
+    """Get request of current context
     """
-    return _requests.get(threading.get_id())
+    return threading.get_context().get('pytsite.router.request')
 
 
-def session() -> http.Session:
+def session() -> Optional[http.Session]:
     """Get session object
+
+    Session is loaded from the store, or created, on first access during a request.
     """
-    return _sessions.get(threading.get_id())
+    ctx = threading.get_context()
+
+    s = ctx.get('pytsite.router.session')
+    if s is None:
+        r = ctx.get('pytsite.router.request')
+        if not r:
+            return None
+
+        sid = r.cookies.get('PYTSITE_SESSION')
+        s = ctx['pytsite.router.session'] = _session_store.get(sid) if sid else _session_store.new()
+
+    return s
 
 
 def delete_session():
@@ -78,27 +110,27 @@ def no_cache(state: bool = None) -> bool:
     """Get/set 'no-cache' cache control status
     """
     if state is None:
-        return _cache_control_no_cache.get(threading.get_id())
+        return threading.get_context().get('pytsite.router.no_cache')
     else:
-        _cache_control_no_cache[threading.get_id()] = state
+        threading.get_context()['pytsite.router.no_cache'] = state
 
 
 def no_store(state: bool = None) -> bool:
     """Get/set 'no-store' cache control status
     """
     if state is None:
-        return _cache_control_no_store.get(threading.get_id())
+        return threading.get_context().get('pytsite.router.no_store')
     else:
-        _cache_control_no_store[threading.get_id()] = state
+        threading.get_context()['pytsite.router.no_store'] = state
 
 
 def private(state: bool = None) -> bool:
     """Get/set 'private' cache control status
     """
     if state is None:
-        return _cache_control_private.get(threading.get_id())
+        return threading.get_context().get('pytsite.router.private')
     else:
-        _cache_control_private[threading.get_id()] = state
+        threading.get_context()['pytsite.router.private'] = state
         return state
 
 
@@ -106,9 +138,9 @@ def max_age(seconds: int = None) -> int:
     """Get/set 'max-age' cache control value
     """
     if seconds is None:
-        return _cache_control_max_age.get(threading.get_id())
+        return threading.get_context().get('pytsite.router.max_age')
     else:
-        _cache_control_max_age[threading.get_id()] = seconds if seconds >= 0 else None
+        threading.get_context()['pytsite.router.max_age'] = seconds if seconds >= 0 else None
 
 
 def handle(controller: Union[str, Type[routing.Controller]], path: str = None, name: str = None,
@@ -144,21 +176,256 @@ def has_rule(rule_name: str) -> bool:
     return _rules.has(rule_name)
 
 
-def call(rule_name: str, args: Mapping, http_request: http.Request = None):
-    """Call a controller
+def match_cache_stats() -> dict:
+    """Get statistics of the rules match results cache
+    """
+    return _rules.match_cache_stats
+
+
+def page_cache_invalidate(path: str = None, prefix: bool = False):
+    """Remove responses from the full-page cache
+
+    If path is not specified, entire cache will be cleared. If prefix is True, responses of all paths which start with
+    the path will be removed.
+    """
+    if path is None:
+        _page_cache.clear()
+    else:
+        _page_cache.rm_prefix(path if prefix else path + '|')
+
+    events.fire('pytsite.router@page_cache_invalidate', path=path, prefix=prefix)
+
+
+def _page_cache_key(req: http.Request) -> Optional[str]:
+    """Get full-page cache key of a request, if its response can be cached
+    """
+    if not reg.get('router.page_cache', False) or req.method != 'GET' or req.is_xhr:
+        return None
+
+    # Responses to requests with sessions or credentials may contain private data
+    if 'PYTSITE_SESSION' in req.cookies or 'Authorization' in req.headers:
+        return None
+
+    # Order of query arguments does not matter
+    query = urlparse.urlencode(sorted(urlparse.parse_qsl(req.environ.get('QUERY_STRING', ''), True)))
+
+    return '{}|{}|{}|{}'.format(req.path, req.host, lang_api.get_current(), query)
+
+
+def _page_cache_get(key: str) -> Optional[http.Response]:
+    """Get a response from the full-page cache
+    """
+    try:
+        item = _page_cache.get_hash(key)
+    except cache.error.KeyNotExist:
+        return None
+    except Exception as e:
+        logger.error(e)
+        return None
+
+    wsgi_response = http.Response(item['body'], item['status'], item['headers'])
+    wsgi_response.headers.set('Age', str(max(int(time()) - item['time'], 0)))
+
+    return wsgi_response
+
+
+def _page_cache_put(key: str, wsgi_response: http.Response):
+    """Put a response into the full-page cache, if its Cache-Control directives allow that
+    """
+    if wsgi_response.status_code != 200 or wsgi_response.direct_passthrough or wsgi_response.is_streamed:
+        return
+
+    if no_store() or no_cache() or private() or not max_age() or 'Set-Cookie' in wsgi_response.headers:
+        return
+
+    try:
+        _page_cache.put_hash(key, {
+            'status': wsgi_response.status_code,
+            'headers': [(k, v) for k, v in wsgi_response.headers if k != 'Age'],
+            'body': wsgi_response.get_data(),
+            'time': int(time()),
+        }, max_age())
+    except Exception as e:
+        logger.error(e)
+
+
+def _set_validators(wsgi_response: http.Response, etag: Optional[str], last_modified: Optional[datetime]):
+    """Set response's validators, if they are not set yet
+    """
+    if etag and wsgi_response.get_etag() == (None, None):
+        wsgi_response.set_etag(etag)
+
+    if last_modified and not wsgi_response.last_modified:
+        wsgi_response.last_modified = last_modified
+
+    return wsgi_response
+
+
+async def _in_context(coro: Coroutine, ctx: dict):
+    """Await a coroutine within an execution context
+    """
+    threading.new_context(ctx)
+
+    return await coro
+
+
+def _exec(controller: routing.Controller):
+    """Execute a controller
+
+    Coroutines returned by asynchronous controllers are run on the event loop serving the request, if any. If current
+    thread runs an event loop, waiting for a coroutine would block the loop forever, so the coroutine is returned to be
+    awaited by the caller.
+    """
+    r = controller.exec()
+    if not iscoroutine(r):
+        return r
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        return r
+
+    req = request()
+    loop = req.environ.get('pytsite.asgi.loop') if req else None
+    coro = _in_context(r, threading.get_context())
+
+    if loop:
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    else:
+        return asyncio.run(coro)
+
+
+def _create_controller(rule_name: str, args: Mapping, http_request: http.Request = None) -> routing.Controller:
+    """Instantiate a controller of a rule
     """
     c = _rules.get(rule_name).controller_class()  # type: routing.Controller
     c.request = http_request or request()
     c.args.update(args)
     c.args.validate()
 
-    return c.exec()
+    return c
+
+
+def call(rule_name: str, args: Mapping, http_request: http.Request = None):
+    """Call a controller
+
+    When called from a coroutine, result of an asynchronous controller is a coroutine which must be awaited.
+    """
+    return _exec(_create_controller(rule_name, args, http_request))
+
+
+def is_async(env: dict) -> bool:
+    """Check whether a request is handled by an asynchronous controller
+    """
+    path = env['PATH_INFO']
+    if len(lang_api.langs()) > 1 and _LANG_CODE_RE.search(path):
+        path = path[3:] or '/'
+    path = _path_aliases.get(path, path)
+
+    try:
+        rule = _rules.match(path, env['REQUEST_METHOD'])[0]  # type: routing.RuleMatch
+    except routing.error.RuleNotFound:
+        return False
+
+    return iscoroutinefunction(rule.controller_class.exec)
 
 
 def dispatch(env: dict, start_response: callable):
     """Dispatch a request
     """
-    tid = threading.get_id()
+    # Each request gets its own context, which is dropped after the response is sent
+    threading.new_context()
+
+    try:
+        app_iter = _dispatch(env, start_response)
+    except BaseException:
+        threading.clear_context()
+        raise
+
+    # Response can be generated lazily, so the context must live until the response is sent completely
+    return ClosingIterator(app_iter, threading.clear_context)
+
+
+async def dispatch_async(env: dict, start_response: callable, executor: Executor = None):
+    """Dispatch a request handled by an asynchronous controller
+
+    Synchronous parts of dispatching are run in the executor, only controller's coroutine is awaited on the event
+    loop. Returned response iterable is synchronous and should be iterated in the executor as well.
+    """
+    threading.new_context()
+
+    try:
+        app_iter = await _dispatch_async(env, start_response, executor)
+    except BaseException:
+        threading.clear_context()
+        raise
+
+    return ClosingIterator(app_iter, threading.clear_context)
+
+
+def _dispatch(env: dict, start_response: callable):
+    """Dispatch a request, executing controllers synchronously
+    """
+    steps = _dispatch_steps(env, start_response)
+
+    try:
+        controller = next(steps)
+        while True:
+            try:
+                r = _exec(controller)
+            except Exception as e:
+                controller = steps.throw(e)
+            else:
+                controller = steps.send(r)
+
+    except StopIteration as e:
+        return e.value
+
+
+def _dispatch_step(steps: Generator, method: str, *args) -> Tuple[bool, Any]:
+    """Advance dispatching pipeline, returns whether it is finished and next controller or the response
+    """
+    try:
+        return False, getattr(steps, method)(*args)
+    except StopIteration as e:
+        return True, e.value
+
+
+async def _dispatch_async(env: dict, start_response: callable, executor: Optional[Executor]):
+    """Dispatch a request, awaiting asynchronous controllers
+    """
+    loop = asyncio.get_running_loop()
+    steps = _dispatch_steps(env, start_response)
+
+    # Steps share request's context, so they see the same execution context dict as the coroutine
+    ctx = contextvars.copy_context()
+
+    def step(*args):
+        return loop.run_in_executor(executor, ctx.run, _dispatch_step, steps, *args)
+
+    done, r = await step('__next__')
+    while not done:
+        try:
+            r = await loop.run_in_executor(executor, ctx.run, r.exec)
+            if iscoroutine(r):
+                r = await r
+        except Exception as e:
+            done, r = await step('throw', e)
+        else:
+            done, r = await step('send', r)
+
+    return r
+
+
+def _dispatch_steps(env: dict, start_response: callable):
+    """Dispatch a request
+
+    Yields controllers to be executed and receives their responses, so the same pipeline serves both synchronous and
+    asynchronous dispatching. Returns WSGI response iterable.
+    """
+    ctx = threading.get_context()
 
     # Check maintenance mode status
     if maintenance.is_enabled():
@@ -219,13 +486,6 @@ def dispatch(env: dict, start_response: callable):
         no_store(False)
         private(False)
 
-    # Session setup
-    sid = req.cookies.get('PYTSITE_SESSION')
-    if sid:
-        _sessions[tid] = _session_store.get(sid)
-    else:
-        _sessions[tid] = _session_store.new()
-
     # Processing request
     try:
         # Notify listeners about incoming request
@@ -236,7 +496,7 @@ def dispatch(env: dict, start_response: callable):
 
         # Search for the rule
         try:
-            rule = _rules.match(req.path, req.method)[0]
+            rule = _rules.match(req.path, req.method)[0]  # type: routing.RuleMatch
         except routing.error.RuleNotFound as e:
             raise http.error.NotFound(e)
 
@@ -256,6 +516,14 @@ def dispatch(env: dict, start_response: callable):
             if isinstance(flt_response, http.Response):
                 return flt_response(env, start_response)
 
+        # Serve a response from the full-page cache
+        sess = ctx.get('pytsite.router.session')
+        page_cache_key = _page_cache_key(req) if not (sess is not None and sess.should_save) else None
+        if page_cache_key:
+            wsgi_response = _page_cache_get(page_cache_key)
+            if wsgi_response:
+                return wsgi_response.make_conditional(req)(env, start_response)
+
         # Prepare response object
         wsgi_response = http.Response(response='', status=200, content_type='text/html', headers=[])
 
@@ -267,13 +535,25 @@ def dispatch(env: dict, start_response: callable):
         controller.args['_pytsite_router_rule_name'] = rule.name
         controller.args.validate()
 
-        # Call controller
-        try:
-            controller_resp = controller.exec()
+        # Validators which controller can provide without rendering a response
+        etag, last_modified = (controller.etag(), controller.last_modified()) if req.method in ('GET', 'HEAD') \
+            else (None, None)
 
-        # Controllers may call other controllers, and they can generate exceptions
-        except routing.error.RuleNotFound as e:
-            raise http.error.NotFound(e)
+        # If the client has an actual copy of the response, there is no need to call controller
+        not_modified = None
+        if etag or last_modified:
+            not_modified = _set_validators(http.Response(status=200), etag, last_modified).make_conditional(req)
+
+        if not_modified and not_modified.status_code == 304:
+            controller_resp = not_modified
+        else:
+            # Call controller
+            try:
+                controller_resp = yield controller
+
+            # Controllers may call other controllers, and they can generate exceptions
+            except routing.error.RuleNotFound as e:
+                raise http.error.NotFound(e)
 
         # Check response from the handler
         if isinstance(controller_resp, str):
@@ -283,9 +563,16 @@ def dispatch(env: dict, start_response: callable):
             wsgi_response.data = controller_resp
         elif isinstance(controller_resp, http.Response):
             wsgi_response = controller_resp
+        elif isinstance(controller_resp, Iterator):
+            # Send chunks to the client as soon as they are generated, without minification
+            wsgi_response = http.Response(controller_resp, 200, content_type='text/html')
         else:
             wsgi_response.data = ''
 
+        # Set validators provided by controller
+        if wsgi_response.status_code == 200:
+            _set_validators(wsgi_response, etag, last_modified)
+
         # Cache control
         cache_control = []
 
@@ -318,14 +605,16 @@ def dispatch(env: dict, start_response: callable):
             flt.response = wsgi_response
             flt.after()
 
-        if session().should_save:
+        # Session which has not been accessed does not need to be stored
+        sess = ctx.get('pytsite.router.session')
+        if sess is not None and sess.should_save:
             # Store updated session data
-            _session_store.save(session())
-            wsgi_response.set_cookie('PYTSITE_SESSION', session().sid)
-        elif not session() and 'PYTSITE_SESSION' in request().cookies:
+            _session_store.save(sess)
+            wsgi_response.set_cookie('PYTSITE_SESSION', sess.sid)
+        elif sess is not None and not sess and 'PYTSITE_SESSION' in req.cookies:
             # Delete session cookie in case of empty session
             wsgi_response.delete_cookie('PYTSITE_SESSION')
-            _session_store.delete(session())
+            _session_store.delete(sess)
 
         if req.is_xhr:
             events.fire('pytsite.router@xhr_response.{}'.format(req.method.lower()), response=wsgi_response)
@@ -333,9 +622,18 @@ def dispatch(env: dict, start_response: callable):
             events.fire('pytsite.router@response.{}'.format(req.method.lower()), response=wsgi_response)
 
         # Set ETag
-        if req.method == 'GET' and wsgi_response.get_etag() == (None, None) and not wsgi_response.direct_passthrough:
+        if req.method == 'GET' and wsgi_response.status_code == 200 and wsgi_response.get_etag() == (None, None) \
+                and not wsgi_response.direct_passthrough and not wsgi_response.is_streamed:
             wsgi_response.set_etag(xxh32_hexdigest(wsgi_response.data))
 
+        # Store the response in the full-page cache
+        if page_cache_key:
+            _page_cache_put(page_cache_key, wsgi_response)
+
+        # Respond with 304 if the client has an actual copy of the response
+        if wsgi_response.status_code == 200:
+            wsgi_response.make_conditional(req)
+
         return wsgi_response(env, start_response)
 
     except Exception as e:
@@ -364,7 +662,7 @@ def dispatch(env: dict, start_response: callable):
 
         # User defined exception handler
         if has_rule('pytsite_router_exception'):
-            wsgi_response = call('pytsite_router_exception', args)
+            wsgi_response = yield _create_controller('pytsite_router_exception', args)
 
         # Builtin exception handler
         else:
@@ -419,22 +717,22 @@ def base_path(lang: str = None) -> str:
     return '/' if lang == lang_api.get_primary() else '/' + lang
 
 
-def url(s: str = '', **kwargs) -> Union[str, list]:
-    """Generate an URL
+@lru_cache(32)
+def _lang_re(langs: Tuple[str, ...]):
+    """Get regular expression which matches language prefix of a path
     """
-    lang_re = _re.compile('^/({})/'.format('|'.join(lang_api.langs())))
+    return _re.compile('^/({})/'.format('|'.join(langs)))
 
-    sch = kwargs.get('scheme', scheme())  # type: str
-    use_main_host = kwargs.get('use_main_host', False)
-    host = kwargs.get('host', server_name(use_main_host))
-    lang = kwargs.get('lang', lang_api.get_current())  # type: str
-    add_lang_prefix = kwargs.get('add_lang_prefix', True)  # type: bool
-    strip_query = kwargs.get('strip_query', False)  # type: bool
-    query = kwargs.get('query')  # type: dict
-    relative = kwargs.get('relative', False)  # type: bool
-    strip_fragment = kwargs.get('strip_fragment', False)  # type: bool
-    fragment = kwargs.get('fragment', '')  # type: str
-    as_list = kwargs.get('as_list', False)
+
+@lru_cache(4096)
+def _build_url(s: str, sch: str, host: str, lang: Optional[str], current_lang: str, langs: Tuple[str, ...],
+               add_lang_prefix: bool, strip_query: bool, query: Optional[dict], relative: bool, strip_fragment: bool,
+               fragment: str) -> Tuple[Tuple[str, ...], str]:
+    """Build an URL, returns its parts and the URL itself
+
+    Results depend on arguments only, so they are memoized unless a query is given.
+    """
+    lang_re = _lang_re(langs)
 
     # https://docs.python.org/3/library/urllib.parse.html#urllib.parse.urlparse
     parsed_url = urlparse.urlparse(s)
@@ -466,8 +764,8 @@ def url(s: str = '', **kwargs) -> Union[str, list]:
     # Add language prefix to the path
     if add_lang_prefix:
         # If language is not already in URL and if language is not a primary one
-        if not lang_re.search(parsed_url[2]) and lang != lang_api.get_primary():
-            b_path = base_path(lang)
+        if not lang_re.search(parsed_url[2]) and lang != langs[0]:
+            b_path = base_path(lang or current_lang)
             if not b_path.endswith('/') and not parsed_url[2].startswith('/'):
                 b_path += '/'
             r[2] = str(b_path + parsed_url[2]).replace('//', '/')
@@ -479,7 +777,33 @@ def url(s: str = '', **kwargs) -> Union[str, list]:
     # Remove unwanted slashes from the end of the path
     r[2] = r[2].rstrip('/')
 
-    return urlparse.urlunparse(r) if not as_list else r
+    return tuple(r), urlparse.urlunparse(r)
+
+
+def url(s: str = '', **kwargs) -> Union[str, list]:
+    """Generate an URL
+    """
+    current_lang = lang_api.get_current()
+    query = kwargs.get('query') or None  # type: dict
+    args = (
+        s,
+        kwargs['scheme'] if 'scheme' in kwargs else scheme(),
+        kwargs['host'] if 'host' in kwargs else server_name(kwargs.get('use_main_host', False)),
+        kwargs.get('lang', current_lang),
+        current_lang,
+        tuple(lang_api.langs()),
+        kwargs.get('add_lang_prefix', True),
+        kwargs.get('strip_query', False),
+        query,
+        kwargs.get('relative', False),
+        kwargs.get('strip_fragment', False),
+        kwargs.get('fragment', ''),
+    )
+
+    # Query dict is not hashable
+    r = _build_url.__wrapped__(*args) if query else _build_url(*args)
+
+    return r[1] if not kwargs.get('as_list', False) else list(r[0])
 
 
 def base_url(lang: str = None, query: dict = None, fragment: str = '', use_main_host: bool = False):
@@ -579,3 +903,9 @@ def on_exception(handler, priority: int = 0):
     """Shortcut
     """
     events.listen('pytsite.router@exception', handler, priority)
+
+
+def on_page_cache_invalidate(handler, priority: int = 0):
+    """Shortcut
+    """
+    events.listen('pytsite.router@page_cache_invalidate', handler, priority)
@@ -4,10 +4,27 @@ __author__ = 'Oleksandr Shepetko'
 __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
+from werkzeug.contrib.sessions import FilesystemSessionStore
 from pytsite import util, reg, logger
+from . import _api
+
+
+def on_pytsite_load():
+    # Clear flash messages from all sessions stored in files. Sessions stored in cache are not scanned, because reading
+    # a session prolongs its lifetime and there may be plenty of them.
+    s_store = _api.get_session_store()
+    if not isinstance(s_store, FilesystemSessionStore):
+        return
+
+    for sid in s_store.list():
+        s_store.save_if_modified(s_store.get(sid).clear_messages())
 
 
 def on_cleanup():
+    # Sessions stored in cache expire by themselves
+    if not isinstance(_api.get_session_store(), FilesystemSessionStore):
+        return
+
     success, failed = util.cleanup_files(reg.get('paths.session'), reg.get('router.session_ttl', 86400))
 
     for f_path in success:
@@ -15,3 +32,12 @@ def on_cleanup():
 
     for f_path, e in failed:
         logger.error('Error while removing obsolete session file {}: {}'.format(f_path, e))
+
+
+def on_update():
+    # Cached pages may be rendered by outdated code
+    _api.page_cache_invalidate()
+
+
+def on_reload():
+    _api.page_cache_invalidate()
@@ -0,0 +1,69 @@
+"""PytSite Router Session Stores
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+from typing import List
+from werkzeug.contrib.sessions import SessionStore as _SessionStore
+from pytsite import http, cache
+
+
+class CacheSessionStore(_SessionStore):
+    """Session Store Which Keeps Sessions in a Cache Pool
+
+    Sessions expire after ttl seconds of inactivity. To avoid writing on every request, expiration time of a session is
+    prolonged on access not more often than once per touch_interval seconds.
+    """
+
+    def __init__(self, pool: cache.Pool, ttl: int = 86400, touch_interval: int = 60):
+        """Init
+        """
+        super().__init__(http.Session)
+
+        self._pool = pool
+        self._ttl = ttl
+        self._touch_interval = touch_interval
+
+    @property
+    def pool(self) -> cache.Pool:
+        """Get cache pool
+        """
+        return self._pool
+
+    def save(self, session: http.Session):
+        """Save a session
+        """
+        self._pool.put_hash(session.sid, dict(session), self._ttl)
+
+    def delete(self, session: http.Session):
+        """Delete a session
+        """
+        self._pool.rm(session.sid)
+
+    def get(self, sid: str) -> http.Session:
+        """Get a session
+        """
+        if not self.is_valid_key(sid):
+            return self.new()
+
+        try:
+            data = self._pool.get_hash(sid)
+        except cache.error.KeyNotExist:
+            return self.new()
+
+        # Prolong session's lifetime
+        if self._ttl:
+            try:
+                ttl = self._pool.ttl(sid)
+                if ttl is not None and self._ttl - ttl >= self._touch_interval:
+                    self._pool.expire(sid, self._ttl)
+            except (cache.error.KeyNotExist, cache.error.KeyNeverExpires):
+                pass
+
+        return self.session_class(data, sid, False)
+
+    def list(self) -> List[str]:
+        """Get IDs of all stored sessions
+        """
+        return list(self._pool.keys())
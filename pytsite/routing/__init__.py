@@ -5,6 +5,6 @@ __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
 from . import _error as error
-from ._rule import Rule
+from ._rule import Rule, RuleMatch
 from ._rules_map import RulesMap
 from ._controller import ControllerArgs, Controller, Filter
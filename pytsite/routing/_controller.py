@@ -5,7 +5,8 @@ __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
 import magic
-from typing import List, Dict, Any, Union, Mapping
+from typing import List, Dict, Any, Union, Mapping, Optional
+from datetime import datetime
 from abc import ABC as _ABC, abstractmethod
 from os import path as p_path
 from mimetypes import guess_extension
@@ -199,9 +200,27 @@ class Controller(_ABC):
         """
         self._response = response
 
+    def etag(self) -> Optional[str]:
+        """Get entity tag of the response
+
+        Override this method if the tag can be determined without rendering the response, so the router is able to
+        respond with 304 without calling exec().
+        """
+        return None
+
+    def last_modified(self) -> Optional[datetime]:
+        """Get modification time of the response
+
+        Override this method if the time can be determined without rendering the response, so the router is able to
+        respond with 304 without calling exec().
+        """
+        return None
+
     @abstractmethod
     def exec(self):
         """Execute the controller
+
+        Can be declared as a coroutine function, so it runs on the event loop serving the request.
         """
         pass
 
@@ -0,0 +1,146 @@
+"""PytSite Routing Rules Matcher
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import re
+from typing import Dict, List, Tuple, Iterable, Pattern
+from ._rule import Rule, _rule_arg_re, _rule_arg_repl_func
+
+# Characters which have special meaning in rule's path regular expression
+_re_special_chars = re.compile('[.^$*+?{}\\[\\]\\\\|()]')
+
+
+class _Node:
+    """Matcher's Tree Node
+    """
+    __slots__ = ('static', 'params', 'tails', 'rules')
+
+    def __init__(self):
+        self.static = {}  # type: Dict[str, _Node]
+        self.params = []  # type: List[Tuple[str, Pattern, _Node]]
+        self.tails = []  # type: List[Tuple[str, int, Rule]]
+        self.rules = []  # type: List[Tuple[int, Rule]]
+
+    def param(self, seg_re: str) -> '_Node':
+        """Get or create a child node for a parametrized segment
+        """
+        for p_seg_re, p_regex, p_node in self.params:
+            if p_seg_re == seg_re:
+                return p_node
+
+        node = _Node()
+        self.params.append((seg_re, re.compile(seg_re), node))
+
+        return node
+
+
+class Matcher:
+    """Routing Rules Matcher
+
+    Splits rules' paths into segments and puts them into a tree, where static segments are looked up in dicts and only
+    parametrized segments are tested against regular expressions. Rules which cannot be split into segments, for example
+    those having a path argument in the middle, are matched using their own regular expressions.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        """Init
+        """
+        self._root = _Node()
+        self._rules = [(i, rule) for i, rule in enumerate(rules) if rule.regex]
+        self._fallback = []  # type: List[Tuple[int, Rule]]
+
+        for i, rule in self._rules:
+            self._add(i, rule)
+
+    def _add(self, i: int, rule: Rule):
+        """Add a rule into the tree
+        """
+        segs = rule.path[1:].split('/') if rule.path != '/' else []
+
+        # Regular expression special characters outside of arguments may match slashes
+        if _re_special_chars.search(_rule_arg_re.sub('', rule.path)):
+            self._fallback.append((i, rule))
+            return
+
+        node = self._root
+        for n, seg in enumerate(segs):
+            args = list(_rule_arg_re.finditer(seg))
+
+            if not args:
+                node = node.static.setdefault(seg, _Node())
+                continue
+
+            if any(a.group(1) == 'path' for a in args):
+                # Path argument matches the rest of the path, including slashes
+                if n == len(segs) - 1 and len(args) == 1 and args[0].group(0) == seg:
+                    node.tails.append((args[0].group(3), i, rule))
+                else:
+                    self._fallback.append((i, rule))
+                return
+
+            node = node.param(_rule_arg_re.sub(_rule_arg_repl_func, seg))
+
+        node.rules.append((i, rule))
+
+    def _walk(self, node: _Node, segs: List[str], n: int, rest: List[str], args: Tuple[Tuple[str, str], ...],
+              method: str, r: List[Tuple[int, Rule, dict]]):
+        """Collect rules which match path's segments starting from n-th one
+        """
+        if n == len(segs):
+            for i, rule in node.rules:
+                if method in rule.methods:
+                    r.append((i, rule, dict(args)))
+            return
+
+        if node.tails and rest[n]:
+            for name, i, rule in node.tails:
+                if method in rule.methods:
+                    r.append((i, rule, dict(args + ((name, rest[n]),))))
+
+        seg = segs[n]
+
+        child = node.static.get(seg)
+        if child:
+            self._walk(child, segs, n + 1, rest, args, method, r)
+
+        for seg_re, regex, child in node.params:
+            m = regex.fullmatch(seg)
+            if m:
+                self._walk(child, segs, n + 1, rest, args + tuple(m.groupdict().items()), method, r)
+
+    def match(self, path: str, method: str) -> List[Tuple[Rule, dict]]:
+        """Get rules which match a path along with their arguments, in order the rules were added
+        """
+        r = []  # type: List[Tuple[int, Rule, dict]]
+
+        # Rules' regular expressions allow an extra leading slash, which makes such paths ambiguous
+        if not path.startswith('/') or path.startswith('//'):
+            fallback = self._rules
+        else:
+            fallback = self._fallback
+
+            # Rules' regular expressions allow an optional trailing slash
+            full = path[1:]
+            body = full[:-1] if full.endswith('/') else full
+            segs = body.split('/') if body else []
+
+            # Path argument receives the rest of the path, including trailing slash
+            rest = []  # type: List[str]
+            pos = 0
+            for seg in segs:
+                rest.append(full[pos:])
+                pos += len(seg) + 1
+
+            self._walk(self._root, segs, 0, rest, (), method, r)
+
+        for i, rule in fallback:
+            if method in rule.methods:
+                m = rule.regex.match(path)
+                if m:
+                    r.append((i, rule, {k: m.group(k) for k in rule.regex.groupindex}))
+
+        r.sort(key=lambda x: x[0])
+
+        return [(rule, args) for i, rule, args in r]
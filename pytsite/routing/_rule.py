@@ -5,7 +5,8 @@ __email__ = 'a@shepetko.com'
 __license__ = 'MIT'
 
 import re
-from typing import Type, List, Union, Tuple
+from typing import Type, List, Union, Tuple, Mapping
+from types import MappingProxyType
 from pytsite import util
 from . import _error
 from ._controller import Controller, Filter
@@ -135,4 +136,52 @@ class Rule:
 
     @property
     def args(self) -> dict:
+        """Get a copy of rule's arguments with default values
+        """
+        return self._args.copy()
+
+
+class RuleMatch:
+    """Result of Matching a Rule Against a Path
+
+    Immutable, so it can be shared between threads without copying.
+    """
+    __slots__ = ('_rule', '_args')
+
+    def __init__(self, rule: Rule, args: Mapping):
+        """Init
+        """
+        r_args = rule.args
+        r_args.update(args)
+
+        self._rule = rule
+        self._args = MappingProxyType(r_args)
+
+    def __repr__(self) -> str:
+        return 'RuleMatch({!r}, {!r})'.format(self._rule.name, dict(self._args))
+
+    @property
+    def rule(self) -> Rule:
+        return self._rule
+
+    @property
+    def args(self) -> Mapping:
+        """Get rule's arguments with values captured from the path
+        """
         return self._args
+
+    @property
+    def name(self) -> str:
+        return self._rule.name
+
+    @property
+    def controller_class(self) -> Type:
+        return self._rule.controller_class
+
+    @property
+    def filters(self) -> List[Type[Filter]]:
+        return self._rule.filters
+
+    @property
+    def attrs(self) -> dict:
+        return self._rule.attrs
@@ -6,9 +6,11 @@ __license__ = 'MIT'
 
 import re
 import json
-from typing import Dict as Dict, List, Mapping
-from copy import deepcopy
+from typing import Dict as Dict, List, Mapping, Optional, Tuple
+from collections import OrderedDict
+from threading import Lock
 from . import _rule, _error
+from ._matcher import Matcher as _Matcher
 
 _rule_arg_re = re.compile('<((\\w+:)?[\\w\\-]+)>')
 _rule_arg_param_re = re.compile('\\w+:')
@@ -18,10 +20,19 @@ class RulesMap:
     """Rules Map
     """
 
-    def __init__(self):
+    def __init__(self, match_cache_size: int = 1024):
         """Init.
         """
         self._rules = {}  # type: Dict[str, _rule.Rule]
+        self._matcher = None  # type: _Matcher
+        self._compiled_paths = {}  # type: Dict[str, Tuple[Tuple[bool, str], ...]]
+        self._lock = Lock()
+
+        # Recent match results, including negative ones, (method, path) -> matches
+        self._match_cache = OrderedDict()  # type: Dict[Tuple[str, str], Optional[Tuple[_rule.RuleMatch, ...]]]
+        self._match_cache_size = match_cache_size
+        self._match_cache_hits = 0
+        self._match_cache_misses = 0
 
     def add(self, rule: _rule.Rule):
         """Add a rule
@@ -30,8 +41,13 @@ class RulesMap:
         if rule.name in self._rules:
             raise _error.RuleExists("Rule with name '{}' is already added".format(rule.name))
 
-        # Add a rule
-        self._rules[rule.name] = rule
+        with self._lock:
+            # Add a rule
+            self._rules[rule.name] = rule
+
+            # Matcher will be rebuilt on next match
+            self._matcher = None
+            self._match_cache.clear()
 
     def has(self, name) -> bool:
         """Check if the rule exists
@@ -47,60 +63,102 @@ class RulesMap:
         except KeyError:
             raise _error.RuleNotFound("Rule '{}' is not found".format(name))
 
-    def match(self, path: str, method: str = 'GET') -> List[_rule.Rule]:
-        """Match rule against a path
+    def match(self, path: str, method: str = 'GET') -> List[_rule.RuleMatch]:
+        """Match rules against a path
         """
-        r = []
         method = method.upper()
+        cache_key = (method, path)
+
+        with self._lock:
+            try:
+                r = self._match_cache[cache_key]
+                self._match_cache.move_to_end(cache_key)
+                self._match_cache_hits += 1
+            except KeyError:
+                r = False
+                self._match_cache_misses += 1
+                matcher = self._matcher
+                if not matcher:
+                    matcher = self._matcher = _Matcher(self._rules.values())
+
+        if r is False:
+            # Match results are immutable, so they can be shared between requests
+            r = tuple(_rule.RuleMatch(rule, args) for rule, args in matcher.match(path, method)) or None
+
+            if self._match_cache_size:
+                with self._lock:
+                    # Do not cache results of a matcher outdated by a rule added in the meantime
+                    if matcher is self._matcher:
+                        self._match_cache[cache_key] = r
+                        if len(self._match_cache) > self._match_cache_size:
+                            self._match_cache.popitem(False)
 
-        for rule in self._rules.values():
-            if not rule.regex:
-                continue
+        if not r:
+            raise _error.RuleNotFound("No rules match the path '{}' against method '{}'".format(path, method))
 
-            m = rule.regex.match(path)
-            if not m or method not in rule.methods:
-                continue
+        return list(r)
 
-            # Fill rule's arguments
-            for group_n, group_i in rule.regex.groupindex.items():
-                rule.args[group_n] = m.group(group_n)
+    @property
+    def match_cache_stats(self) -> dict:
+        """Get statistics of the match results cache
+        """
+        with self._lock:
+            return {
+                'size': len(self._match_cache),
+                'max_size': self._match_cache_size,
+                'hits': self._match_cache_hits,
+                'misses': self._match_cache_misses,
+            }
+
+    def _compile_path(self, rule: _rule.Rule) -> Tuple[Tuple[bool, str], ...]:
+        """Split rule's path into literal parts and argument placeholders
+        """
+        r = []
+        pos = 0
+        for match in _rule_arg_re.finditer(rule.path):
+            if match.start() > pos:
+                r.append((False, rule.path[pos:match.start()]))
+            r.append((True, _rule_arg_param_re.sub('', match.group(1))))
+            pos = match.end()
 
-            r.append(rule)
+        if pos < len(rule.path):
+            r.append((False, rule.path[pos:]))
 
-        if not r:
-            raise _error.RuleNotFound("No rules match the path '{}' against method '{}'".format(path, method))
+        r = tuple(r)
+        self._compiled_paths[rule.name] = r
 
         return r
 
     def path(self, name: str, args: Mapping = None) -> str:
         """Build a path for a rule
         """
-        args = deepcopy(args) if args is not None else {}
-
-        def repl(match, _rule, _args):
-            arg_k = _rule_arg_param_re.sub('', match.group(1))
-
-            if arg_k in _args:
-                return str(_args.pop(arg_k))
-            elif arg_k in _rule.defaults:
-                return str(_rule.defaults[arg_k])
-            else:
-                raise _error.RulePathBuildError("Argument '{}' for rule '{}' is not provided".format(arg_k, name))
-
         rule = self.get(name)
 
         if not rule.path:
             raise _error.RulePathBuildError("Rule '{}' has no path".format(name))
 
+        if args is None:
+            args = {}
+
         # Fill rule's args with values
-        path = _rule_arg_re.sub(lambda match: repl(match, rule, args), rule.path)
+        parts = []
+        used_args = set()
+        for is_arg, value in self._compiled_paths.get(name) or self._compile_path(rule):
+            if not is_arg:
+                parts.append(value)
+            elif value in args and value not in used_args:
+                parts.append(str(args[value]))
+                used_args.add(value)
+            elif value in rule.defaults:
+                parts.append(str(rule.defaults[value]))
+            else:
+                raise _error.RulePathBuildError("Argument '{}' for rule '{}' is not provided".format(value, name))
 
-        # Add remaining args as query string
-        if args:
-            c_args = {}
-            for k, v in args.items():
-                c_args[k] = json.dumps(v) if isinstance(v, (list, tuple, dict)) else v
+        path = ''.join(parts)
 
-            path += '?' + '&'.join(['{}={}'.format(k, v) for k, v in c_args.items()])
+        # Add remaining args as query string
+        if len(used_args) < len(args):
+            path += '?' + '&'.join(['{}={}'.format(k, json.dumps(v) if isinstance(v, (list, tuple, dict)) else v)
+                                    for k, v in args.items() if k not in used_args])
 
         return path
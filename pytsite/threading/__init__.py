@@ -7,4 +7,5 @@ __license__ = 'MIT'
 # Public API
 from ._thread import Thread
 from ._timer import Timer
-from ._api import get_id, get_parent_id, run_in_thread, create_thread, create_timer
+from ._api import get_id, get_parent_id, run_in_thread, create_thread, create_timer, get_context, new_context, \
+    clear_context
@@ -6,9 +6,13 @@ __license__ = 'MIT'
 
 from typing import Union, Optional
 from threading import Thread as PythonThread, current_thread
+from contextvars import ContextVar
 from ._thread import Thread
 from ._timer import Timer
 
+# Data of current execution context, i. e. thread, greenlet or asyncio task
+_context = ContextVar('pytsite_context', default=None)
+
 
 def get_id() -> int:
     """Get current thread ID
@@ -23,6 +27,36 @@ def get_parent_id() -> Optional[int]:
     return t.parent.ident if isinstance(t, (Thread, Timer)) else None
 
 
+def get_context() -> dict:
+    """Get data of current execution context
+    """
+    ctx = _context.get()
+
+    if ctx is None:
+        ctx = new_context()
+
+    return ctx
+
+
+def new_context(ctx: dict = None) -> dict:
+    """Start a new execution context
+
+    Data of another context can be passed to share it, for example, with an asyncio task.
+    """
+    if ctx is None:
+        ctx = {}
+
+    _context.set(ctx)
+
+    return ctx
+
+
+def clear_context():
+    """Drop data of current execution context
+    """
+    _context.set(None)
+
+
 def create_thread(target, **kwargs) -> Thread:
     """Create a new thread
     """
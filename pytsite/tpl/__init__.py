@@ -7,7 +7,7 @@ __license__ = 'MIT'
 # Public API
 import jinja2
 import json
-from typing import Mapping
+from typing import Mapping, Iterator
 from datetime import datetime
 from importlib.util import find_spec as find_module_spec
 from os import path
@@ -122,6 +122,25 @@ def render(template: str, args: Mapping = None, emit_event: bool = True) -> str:
     return _env.get_template(template).render(args)
 
 
+def render_stream(template: str, args: Mapping = None, emit_event: bool = True, buffer_size: int = 16) -> Iterator[str]:
+    """Render a template part by part
+
+    Rendered parts are joined into chunks of buffer_size parts each, so result can be returned from a controller to
+    start sending a response before the template is rendered completely.
+    """
+    if not args:
+        args = {}
+
+    if emit_event:
+        events.fire('pytsite.tpl@render', tpl_name=template, args=args)
+
+    stream = _env.get_template(template).stream(args)
+    if buffer_size > 1:
+        stream.enable_buffering(buffer_size)
+
+    return stream
+
+
 def on_render(handler, priority: int = 0):
     """Shortcut function to register event handler
     """
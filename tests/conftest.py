@@ -0,0 +1,30 @@
+"""PytSite Tests Fixtures
+
+Importing pytsite requires an application root, so tests must be run from within an application's environment.
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import pytest
+from os import path
+from pytsite import reg
+
+
+@pytest.fixture
+def file_driver(tmp_path):
+    """File cache driver which stores data in a temporary directory
+    """
+    from pytsite import cache
+
+    storage = reg.get('cache.file_driver_storage', path.join(reg.get('paths.storage'), 'cache'))
+    segment_size = reg.get('cache.file_driver_list_segment_size', 262144)
+
+    # Small segments make lists span several segment files
+    reg.put('cache.file_driver_storage', str(tmp_path))
+    reg.put('cache.file_driver_list_segment_size', 64)
+    try:
+        yield cache.driver.File()
+    finally:
+        reg.put('cache.file_driver_storage', storage)
+        reg.put('cache.file_driver_list_segment_size', segment_size)
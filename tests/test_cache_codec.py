@@ -0,0 +1,52 @@
+"""PytSite Cache Codecs Tests
+
+Importing pytsite requires an application root, so these tests must be run from within an application's environment.
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import pytest
+from collections import OrderedDict
+from pytsite import reg
+from pytsite.cache import _codec
+
+_VALUES = (None, True, 1, 1.5, 'str', b'bytes', (1, 2), [1, (2, 3)], {'a': (1, 2), 1: b'x'}, OrderedDict(a=1),
+           {'nested': {'list': [1, 'a', None]}}, 'x' * 10000)
+
+
+@pytest.fixture(params=[('pickle', None), ('msgpack', None), ('pickle', 'zstd'), ('msgpack', 'lz4')])
+def options(request):
+    codec, compressor = request.param
+    if codec == 'msgpack':
+        pytest.importorskip('msgpack')
+    if compressor:
+        pytest.importorskip({'zstd': 'zstandard', 'lz4': 'lz4.frame'}[compressor])
+
+    prev = reg.get('cache.codec', 'pickle'), reg.get('cache.compress')
+    reg.put('cache.codec', codec)
+    reg.put('cache.compress', compressor)
+    try:
+        yield codec, compressor
+    finally:
+        reg.put('cache.codec', prev[0])
+        reg.put('cache.compress', prev[1])
+
+
+@pytest.mark.parametrize('value', _VALUES)
+def test_round_trip(options, value):
+    codec, data = _codec.encode(value, 'test')
+    r = _codec.decode(codec, data)
+
+    assert r == value
+    assert type(r) is type(value)
+
+
+def test_compression(options):
+    codec, data = _codec.encode('x' * 10000, 'test')
+
+    if options[1]:
+        assert codec >> 4
+        assert len(data) < 10000
+    else:
+        assert not codec >> 4
@@ -0,0 +1,191 @@
+"""PytSite Cache File Driver Tests
+
+Importing pytsite requires an application root, so these tests must be run from within an application's environment.
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import pytest
+from time import sleep
+from pytsite import cache
+
+
+def test_put_get(file_driver):
+    file_driver.put('p', 'str', 'value')
+    file_driver.put('p', 'tuple', (1, 'a'))
+    file_driver.put('p', 'none', None)
+
+    assert file_driver.get('p', 'str') == 'value'
+    assert file_driver.get('p', 'tuple') == (1, 'a')
+    assert file_driver.get('p', 'none') is None
+    assert file_driver.type('p', 'tuple') is tuple
+    assert file_driver.has('p', 'str')
+    assert not file_driver.has('p', 'missing')
+    assert not file_driver.has('other', 'str')
+
+    with pytest.raises(cache.error.KeyNotExist):
+        file_driver.get('p', 'missing')
+
+
+def test_put_rejects_containers(file_driver):
+    with pytest.raises(cache.error.ValueTypeError):
+        file_driver.put('p', 'k', {'a': 1})
+
+    with pytest.raises(cache.error.ValueTypeError):
+        file_driver.put('p', 'k', [1])
+
+
+def test_many(file_driver):
+    file_driver.put_many('p', {'a': 1, 'b': 2})
+
+    assert file_driver.get_many('p', ['a', 'b', 'c']) == {'a': 1, 'b': 2, 'c': cache.MISSING}
+    assert file_driver.has_many('p', ['a', 'c']) == {'a': True, 'c': False}
+
+    file_driver.rm_many('p', ['a', 'c'])
+    assert sorted(file_driver.keys('p')) == ['b']
+
+
+def test_rm(file_driver):
+    file_driver.put('p', 'a', 1)
+    file_driver.put_list('p', 'b', [1, 2])
+    file_driver.rm('p', 'a')
+    file_driver.rm('p', 'b')
+
+    assert not file_driver.has('p', 'a')
+    assert not file_driver.has('p', 'b')
+    assert list(file_driver.keys('p')) == []
+
+
+def test_expiry(file_driver):
+    file_driver.put('p', 'short', 1, 1)
+    file_driver.put('p', 'long', 2, 60)
+    file_driver.put('p', 'forever', 3)
+
+    assert file_driver.ttl('p', 'forever') is None
+    assert 0 < file_driver.ttl('p', 'long') <= 60
+
+    sleep(1.1)
+
+    assert not file_driver.has('p', 'short')
+    with pytest.raises(cache.error.KeyNotExist):
+        file_driver.get('p', 'short')
+
+    file_driver.expire('p', 'forever', 1)
+    assert file_driver.ttl('p', 'forever') <= 1
+
+
+def test_keys(file_driver):
+    file_driver.put('p', 'a:1', 1)
+    file_driver.put('p', 'a:2', 2, 1)
+    file_driver.put('p', 'b:1', 3)
+    file_driver.put_hash('p', 'a:3', {'x': 1})
+    file_driver.put('other', 'a:4', 4)
+
+    assert sorted(file_driver.keys('p')) == ['a:1', 'a:2', 'a:3', 'b:1']
+    assert sorted(file_driver.scan('p', 'a:')) == ['a:1', 'a:2', 'a:3']
+
+    # Expired keys are not listed even before they are swept
+    sleep(1.1)
+    assert sorted(file_driver.keys('p')) == ['a:1', 'a:3', 'b:1']
+    assert sorted(file_driver.scan('p', 'a:')) == ['a:1', 'a:3']
+
+    file_driver.rm_prefix('p', 'a:')
+    assert list(file_driver.keys('p')) == ['b:1']
+
+    file_driver.clear('p')
+    assert list(file_driver.keys('p')) == []
+    assert list(file_driver.keys('other')) == ['a:4']
+
+
+def test_sweep(file_driver):
+    file_driver.put('p', 'a', 1, 1)
+    file_driver.put('p', 'b', 2)
+
+    sleep(1.1)
+    file_driver.sweep('p', 100)
+
+    assert list(file_driver.keys('p')) == ['b']
+
+
+def test_hash(file_driver):
+    assert file_driver.put_hash('p', 'h', {'a': 1, 'b': [1, 2]}, 60) == {'a': 1, 'b': [1, 2]}
+    assert file_driver.type('p', 'h') is dict
+    assert file_driver.get_hash('p', 'h') == {'a': 1, 'b': [1, 2]}
+    assert file_driver.get_hash('p', 'h', ['a', 'c']) == {'a': 1}
+    assert file_driver.get_hash_item('p', 'h', 'a') == 1
+    assert file_driver.get_hash_item('p', 'h', 'c', 'default') == 'default'
+
+    assert file_driver.put_hash_item('p', 'h', 'c', 3) == {'a': 1, 'b': [1, 2], 'c': 3}
+    assert file_driver.rm_hash_item('p', 'h', 'a') == {'b': [1, 2], 'c': 3}
+    assert 0 < file_driver.ttl('p', 'h') <= 60
+
+    # Emptied hash still exists
+    file_driver.rm_hash_item('p', 'h', 'b')
+    file_driver.rm_hash_item('p', 'h', 'c')
+    assert file_driver.get_hash('p', 'h') == {}
+
+    with pytest.raises(cache.error.ValueTypeError):
+        file_driver.get('p', 'h')
+
+    with pytest.raises(cache.error.KeyNotExist):
+        file_driver.get_hash('p', 'missing')
+
+
+def test_list(file_driver):
+    value = ['item-{}'.format(i) for i in range(20)]
+
+    assert file_driver.put_list('p', 'l', value, 60) == value
+    assert file_driver.type('p', 'l') is list
+    assert file_driver.list_len('p', 'l') == 20
+    assert file_driver.get_list('p', 'l') == value
+    assert file_driver.get_list('p', 'l', 5, 8) == value[5:8]
+    assert file_driver.get_list('p', 'l', -3) == value[-3:]
+
+    assert file_driver.list_l_push('p', 'l', 'first') == 21
+    assert file_driver.list_r_push('p', 'l', 'last') == 22
+    assert file_driver.list_l_pop('p', 'l') == 'first'
+    assert file_driver.list_r_pop('p', 'l') == 'last'
+    assert file_driver.get_list('p', 'l') == value
+    assert 0 < file_driver.ttl('p', 'l') <= 60
+
+    with pytest.raises(cache.error.ValueTypeError):
+        file_driver.get('p', 'l')
+
+    file_driver.put('p', 's', 1)
+    with pytest.raises(cache.error.ValueTypeError):
+        file_driver.list_r_push('p', 's', 1)
+
+
+def test_list_queue(file_driver):
+    # Push to the tail and pop from the head, as queues do, so consumed records are compacted on the way
+    for i in range(200):
+        file_driver.list_r_push('p', 'q', i)
+        if i >= 10:
+            assert file_driver.list_l_pop('p', 'q') == i - 10
+
+    assert file_driver.get_list('p', 'q') == list(range(190, 200))
+
+    for i in range(190, 200):
+        assert file_driver.list_l_pop('p', 'q') == i
+
+    # Emptied list is removed
+    assert not file_driver.has('p', 'q')
+    with pytest.raises(cache.error.KeyNotExist):
+        file_driver.list_l_pop('p', 'q')
+
+
+def test_list_push_creates(file_driver):
+    assert file_driver.list_r_push('p', 'l', 'a', 60) == 1
+    assert file_driver.list_l_push('p', 'l', 'b') == 2
+    assert file_driver.get_list('p', 'l') == ['b', 'a']
+    assert 0 < file_driver.ttl('p', 'l') <= 60
+
+
+def test_lock(file_driver):
+    assert file_driver.lock('p', 'k', 5)
+    assert not file_driver.lock('p', 'k', 5)
+
+    file_driver.unlock('p', 'k')
+    assert file_driver.lock('p', 'k', 5)
+    file_driver.unlock('p', 'k')
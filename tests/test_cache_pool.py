@@ -0,0 +1,90 @@
+"""PytSite Cache Pool Tests
+
+Importing pytsite requires an application root, so these tests must be run from within an application's environment.
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import pytest
+from time import sleep
+from pytsite import cache
+
+
+@pytest.fixture(params=['memory', 'file'])
+def pool(request):
+    drv = request.getfixturevalue('file_driver') if request.param == 'file' else cache.driver.Memory()
+
+    return cache.Pool('test', lambda: drv)
+
+
+def test_get_or_compute_scalar(pool):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return 'value'
+
+    assert pool.get_or_compute('key', fn, 60) == 'value'
+    assert pool.get_or_compute('key', fn, 60) == 'value'
+    assert len(calls) == 1
+
+
+def test_get_or_compute_dict(pool):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return {'a': {'b': 1}, 'c': [1, 2]}
+
+    assert pool.get_or_compute('key', fn, 60) == {'a': {'b': 1}, 'c': [1, 2]}
+    assert pool.get_or_compute('key', fn, 60) == {'a': {'b': 1}, 'c': [1, 2]}
+    assert pool.get_hash('key') == {'a': {'b': 1}, 'c': [1, 2]}
+    assert len(calls) == 1
+
+
+def test_get_or_compute_list(pool):
+    assert pool.get_or_compute('key', lambda: [1, 'a', None], 60) == [1, 'a', None]
+    assert pool.get_or_compute('key', lambda: [2], 60) == [1, 'a', None]
+    assert pool.get_list('key') == [1, 'a', None]
+
+
+def test_get_or_compute_expired(pool):
+    assert pool.get_or_compute('key', lambda: 1, 1) == 1
+    sleep(1.1)
+    assert pool.get_or_compute('key', lambda: 2, 1) == 2
+
+
+def test_get_or_compute_stale(pool):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert pool.get_or_compute('key', fn, 1, 60) == 1
+    assert pool.get_or_compute('key', fn, 1, 60) == 1
+    assert len(calls) == 1
+
+    # Stale value is recomputed by the caller which notices it
+    sleep(1.1)
+    assert pool.get_or_compute('key', fn, 1, 60) == 2
+    assert pool.get_or_compute('key', fn, 1, 60) == 2
+
+
+def test_get_or_compute_stale_without_ttl(pool):
+    pool.put('key', 'value')
+
+    # Value stored without expiration time is never stale
+    assert pool.get_or_compute('key', lambda: 'new', 1, 60) == 'value'
+    assert pool.ttl('key') is None
+
+
+def test_get_or_compute_error(pool):
+    def fn():
+        raise RuntimeError('Failed')
+
+    with pytest.raises(RuntimeError):
+        pool.get_or_compute('key', fn, 60)
+
+    assert not pool.has('key')
@@ -0,0 +1,81 @@
+"""PytSite Router Full-Page Cache Tests
+
+Importing pytsite requires an application root, so these tests must be run from within an application's environment.
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import pytest
+from werkzeug.test import EnvironBuilder
+from pytsite import reg, cache, router, routing
+
+
+class _Counter(routing.Controller):
+    """Controller which counts its calls
+    """
+    calls = 0
+
+    def exec(self):
+        _Counter.calls += 1
+        router.max_age(60)
+
+        return 'Hello, World'
+
+
+@pytest.fixture
+def page_cache():
+    prev_driver, prev_enabled = cache.get_driver(), reg.get('router.page_cache', False)
+
+    cache.set_driver(cache.driver.Memory(), 'none')
+    if not router.has_rule('test_page_cache'):
+        router.handle(_Counter, '/test/page-cache', 'test_page_cache')
+
+    reg.put('router.page_cache', True)
+    _Counter.calls = 0
+
+    try:
+        yield
+    finally:
+        router.page_cache_invalidate()
+        reg.put('router.page_cache', prev_enabled)
+        cache.set_driver(prev_driver, 'none')
+
+
+def _get(path: str) -> tuple:
+    """Dispatch a GET request, returns status, headers and body of the response
+    """
+    status_headers = []
+
+    def start_response(status, headers, exc_info=None):
+        status_headers.extend((status, dict(headers)))
+
+    app_iter = router.dispatch(EnvironBuilder(path=path, base_url='http://localhost').get_environ(), start_response)
+    try:
+        body = b''.join(app_iter)
+    finally:
+        app_iter.close()
+
+    return status_headers[0], status_headers[1], body
+
+
+def test_second_request_is_served_from_cache(page_cache):
+    status, headers, body = _get('/test/page-cache')
+    assert status.startswith('200')
+    assert body == b'Hello, World'
+    assert 'Age' not in headers
+    assert _Counter.calls == 1
+
+    status, headers, body = _get('/test/page-cache')
+    assert status.startswith('200')
+    assert body == b'Hello, World'
+    assert 'Age' in headers
+    assert _Counter.calls == 1
+
+
+def test_invalidated_page_is_rendered_again(page_cache):
+    _get('/test/page-cache')
+    router.page_cache_invalidate('/test/page-cache')
+    _get('/test/page-cache')
+
+    assert _Counter.calls == 2
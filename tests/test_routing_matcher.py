@@ -0,0 +1,79 @@
+"""PytSite Routing Rules Matcher Tests
+
+Importing pytsite requires an application root, so these tests must be run from within an application's environment.
+"""
+__author__ = 'Oleksandr Shepetko'
+__email__ = 'a@shepetko.com'
+__license__ = 'MIT'
+
+import pytest
+from random import Random
+from pytsite import routing
+from pytsite.routing._matcher import Matcher
+
+_PATHS = ('/', '/a', '/a/<id>', '/a/<int:id>', '/a/<int:id>/edit', '/<path:p>', '/a/<path:rest>',
+          '/b/<hex:h>-<alpha:s>', '/c/<choice(x|y):c>', '/sitemap.xml', '/d/<path:p>/edit', '/e/<alnum:a>/<float:f>',
+          '/a/<id>/<int:n>', '/f/<common:x>', '/<lang>/page', '/page/<int:p>')
+
+_TOKENS = ('a', 'b', 'c', 'x', 'y', '12', 'ff-ab', 'edit', 'sitemap.xml', 'sitemapxxml', 'd', 'e', 'f', 'q1', '1.5',
+           'page', '', 'en')
+
+
+class _Controller(routing.Controller):
+    def exec(self):
+        pass
+
+
+@pytest.fixture(scope='module')
+def rules():
+    return [routing.Rule(_Controller, path, 'rule_{}'.format(i), methods=('GET', 'POST') if i % 3 else 'GET')
+            for i, path in enumerate(_PATHS)]
+
+
+def _linear_match(rules, path: str, method: str) -> list:
+    """Match rules one by one using their regular expressions, as RulesMap did before Matcher was introduced
+    """
+    r = []
+    for rule in rules:
+        m = rule.regex.match(path)
+        if m and method in rule.methods:
+            r.append((rule.name, {k: m.group(k) for k in rule.regex.groupindex}))
+
+    return r
+
+
+def _match(matcher: Matcher, path: str, method: str) -> list:
+    return [(rule.name, args) for rule, args in matcher.match(path, method)]
+
+
+@pytest.mark.parametrize('path, method, expected', [
+    ('/', 'GET', ['rule_0']),
+    ('/a/12', 'GET', ['rule_2', 'rule_3', 'rule_5', 'rule_6']),
+    ('/a/12/edit', 'POST', ['rule_4', 'rule_5']),
+    ('/sitemap.xml', 'GET', ['rule_5', 'rule_9']),
+    ('/sitemapxxml', 'GET', ['rule_5', 'rule_9']),
+    ('/d/x/y/edit', 'POST', ['rule_5', 'rule_10']),
+    ('/c/z', 'POST', ['rule_5']),
+])
+def test_match(rules, path, method, expected):
+    assert [name for name, args in _match(Matcher(rules), path, method)] == expected
+
+
+def test_match_args(rules):
+    assert _match(Matcher(rules), '/b/ff-ab', 'POST') == [
+        ('rule_5', {'p': 'b/ff-ab'}),
+        ('rule_7', {'h': 'ff', 's': 'ab'}),
+    ]
+
+
+def test_same_as_linear_match(rules):
+    matcher = Matcher(rules)
+    rnd = Random(0)
+
+    for _ in range(20000):
+        path = '/' + '/'.join(rnd.choice(_TOKENS) for _ in range(rnd.randint(0, 4))) + rnd.choice(('', '', '/'))
+        if rnd.random() < 0.05:
+            path = '/' + path
+        method = rnd.choice(('GET', 'POST'))
+
+        assert _match(matcher, path, method) == _linear_match(rules, path, method), (path, method)